@@ -16,25 +16,74 @@ import time
 import os
 import uvicorn
 import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, HTTPException, Request, WebSocketDisconnect
 from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from logging_config import get_logger, setup_logging
 from dotenv import load_dotenv
-from water_monitor import register_routes
 
 # ============================================================================
 # CONFIGURACIÓN INICIAL Y LOGGING
 # ============================================================================
 
 # Cargar variables de entorno desde archivo .env
+# (antes de importar los módulos de monitoreo, que leen su configuración al importarse)
 load_dotenv()
 
+from water_monitor import register_routes, startup_water_monitor, shutdown_water_monitor
+
 # Configurar sistema de logging para toda la aplicación
 setup_logging()
 logger = get_logger(__name__)
 
+# Instante de arranque en reloj monotónico: el uptime se obtiene con una resta,
+# sin datetime.now() ni timedelta, y no se ve afectado por ajustes del reloj
+START_MONOTONIC = time.monotonic()
+
+# ============================================================================
+# CICLO DE VIDA DE LA APLICACIÓN
+# ============================================================================
+
+# Hooks del monitor de sistema; quedan en None si no se pudo integrar
+system_monitor_hooks = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de Vida de la Aplicación
+    ==============================
+    
+    Reemplaza a los @app.on_event("startup"/"shutdown") (obsoletos en Starlette,
+    que además los ignora si se define un lifespan). Todo el arranque ocurre aquí,
+    en un orden fijo y antes de que llegue la primera petición:
+    1. Monitor de sistema (para que registre los eventos de los demás subsistemas)
+    2. Monitor de agua: precalienta los payloads cacheados y lanza las tareas
+       de broadcast y datos simulados
+    
+    El cierre se hace en orden inverso.
+    """
+    logger.info("🚀 Iniciando servidor de Monitor de Agua IoT...")
+    logger.info("=" * 60)
+    logger.info("📋 Sistema de Monitoreo de Calidad de Agua")
+    logger.info("🏗️  Arquitectura: Arduino + FastAPI + WebSockets")
+    logger.info("🐳 Contenedor: Docker")
+    logger.info("☁️  Despliegue: AWS")
+    logger.info("=" * 60)
+    
+    if system_monitor_hooks:
+        await system_monitor_hooks[0]()
+    await startup_water_monitor()
+    
+    yield
+    
+    logger.info("🛑 Cerrando servidor de Monitor de Agua IoT...")
+    await shutdown_water_monitor()
+    if system_monitor_hooks:
+        await system_monitor_hooks[1]()
+    logger.info("✅ Cleanup completado")
+
 # ============================================================================
 # CREACIÓN DE LA APLICACIÓN FASTAPI
 # ============================================================================
@@ -59,6 +108,7 @@ app = FastAPI(
     docs_url="/docs",           # Swagger UI automático
     redoc_url="/redoc",         # ReDoc UI alternativo
     openapi_url="/openapi.json", # Esquema OpenAPI
+    lifespan=lifespan,          # Arranque y cierre de tareas en background
 )
 
 # ============================================================================
@@ -99,7 +149,7 @@ async def log_requests_middleware(request: Request, call_next):
     """
     # Generar ID único para rastrear cada petición
     request_id = str(uuid.uuid4())[:8]  # Solo primeros 8 caracteres
-    start_time = time.time()
+    start_time = time.monotonic()
     
     # Log de la petición entrante
     logger.info(
@@ -111,7 +161,7 @@ async def log_requests_middleware(request: Request, call_next):
     try:
         # Ejecutar la petición y medir tiempo de respuesta
         response = await call_next(request)
-        process_time = time.time() - start_time
+        process_time = time.monotonic() - start_time
         
         # Determinar emoji según el status code
         status_emoji = "✅" if response.status_code < 400 else "❌"
@@ -236,7 +286,7 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": current_time.isoformat(),
-        "uptime": "Calculando...",  # En producción, calcular uptime real
+        "uptime": f"{time.monotonic() - START_MONOTONIC:.3f}",  # Segundos desde el arranque
         "version": "2.0.0",
         "environment": os.getenv("ENVIRONMENT", "development"),
         "websockets": "active",
@@ -258,54 +308,15 @@ register_routes(app)
 # - Logs estructurados para debugging
 # - Topología de red del sistema distribuido
 try:
-    from system_monitor import integrate_system_monitor
+    from system_monitor import integrate_system_monitor, start_system_monitoring, stop_system_monitoring
     integrate_system_monitor(app)
+    system_monitor_hooks = (start_system_monitoring, stop_system_monitoring)
     logger.info("🔍 Monitor de sistema distribuido integrado exitosamente")
 except ImportError:
     logger.warning("⚠️ Monitor de sistema no disponible (instalar psutil para habilitarlo)")
 except Exception as e:
     logger.error(f"💥 Error integrando monitor de sistema: {str(e)}")
 
-# ============================================================================
-# EVENTOS DEL CICLO DE VIDA DE LA APLICACIÓN
-# ============================================================================
-
-@app.on_event("startup")
-async def startup_event():
-    """
-    Evento de Inicio de la Aplicación
-    =================================
-    
-    Se ejecuta cuando el servidor inicia. Útil para:
-    - Inicializar conexiones a base de datos
-    - Configurar tareas en background
-    - Validar configuraciones
-    - Establecer estado inicial
-    """
-    logger.info("🚀 Iniciando servidor de Monitor de Agua IoT...")
-    logger.info("=" * 60)
-    logger.info("📋 Sistema de Monitoreo de Calidad de Agua")
-    logger.info("🏗️  Arquitectura: Arduino + FastAPI + WebSockets")
-    logger.info("🐳 Contenedor: Docker")
-    logger.info("☁️  Despliegue: AWS")
-    logger.info("=" * 60)
-    
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """
-    Evento de Cierre de la Aplicación
-    =================================
-    
-    Se ejecuta cuando el servidor se cierra. Útil para:
-    - Cerrar conexiones a base de datos
-    - Guardar estado persistente
-    - Cancelar tareas en background
-    - Cleanup de recursos
-    """
-    logger.info("🛑 Cerrando servidor de Monitor de Agua IoT...")
-    logger.info("✅ Cleanup completado")
-
 # ============================================================================
 # FUNCIÓN PRINCIPAL - PUNTO DE ENTRADA
 # ============================================================================
@@ -327,7 +338,24 @@ if __name__ == "__main__":
     host = os.getenv("HOST", "0.0.0.0")
     debug_mode = os.getenv("DEBUG", "True").lower() == "true"
     
+    # Event loop: uvloop (libuv en C) si está instalado, asyncio estándar si no.
+    # Uvicorn crea el loop antes de importar la app, por eso se elige aquí
+    # y no dentro de los módulos de monitoreo.
+    try:
+        import uvloop  # noqa: F401
+        event_loop = "uvloop"
+    except ImportError:
+        event_loop = "asyncio"
+    
+    # Parser HTTP: httptools (binding de llhttp en C) si está instalado, h11 si no
+    try:
+        import httptools  # noqa: F401
+        http_impl = "httptools"
+    except ImportError:
+        http_impl = "h11"
+    
     logger.info(f"🌐 Iniciando servidor en {host}:{port}")
+    logger.info(f"⚡ Event loop: {event_loop}, parser HTTP: {http_impl}")
     logger.info(f"🔧 Modo debug: {debug_mode}")
     logger.info(f"📂 Directorio de trabajo: {os.getcwd()}")
     
@@ -338,5 +366,11 @@ if __name__ == "__main__":
         host=host, 
         port=port, 
         reload=False,  # Desactivado para Python 3.12 compatibility
+        loop=event_loop,
+        http=http_impl,
+        # Sin permessage-deflate: los broadcasts envían el mismo payload a todos los
+        # clientes y comprimirlo por conexión repetiría el trabajo N veces; los payloads
+        # grandes del monitor de sistema ya se comprimen una sola vez en el servidor
+        ws_per_message_deflate=False,
         log_level="info" if not debug_mode else "debug"
     )
\ No newline at end of file
@@ -476,7 +476,10 @@ function connectWebSocket() {
             console.log('📊 Datos recibidos del servidor:', data);
             
             // VALIDACIÓN ADICIONAL: Verificar que tenemos un objeto válido
-            if (data && typeof data === 'object') {
+            if (data && data.type === 'multi' && Array.isArray(data.payload)) {
+                // Varias lecturas agrupadas en un solo frame: aplicarlas en orden
+                data.payload.forEach(updateInterface);
+            } else if (data && typeof data === 'object') {
                 updateInterface(data);
             } else {
                 console.warn('⚠️ Datos recibidos no tienen formato esperado:', data);
@@ -0,0 +1,88 @@
+"""
+Páginas Estáticas en Memoria
+============================
+
+Las páginas HTML del sistema (dashboard admin, monitor de agua, etc.) no
+cambian mientras el servidor está corriendo. En lugar de consultar el disco
+en cada petición (exists + stat + open + read), se leen una sola vez y se
+sirven desde memoria:
+
+- Sin sangrías: el espaciado sigue siendo equivalente en HTML/CSS/JS
+- Versión gzip comprimida una única vez por proceso
+- ETag precalculado: las recargas del navegador reciben un 304 sin cuerpo
+"""
+
+import gzip
+import hashlib
+import re
+from typing import Optional
+from fastapi import Request
+from fastapi.responses import Response
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Compara If-None-Match (lista separada por comas, con o sin W/) contra el ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+class CachedPage:
+    """
+    Página HTML cargada una vez en memoria, con variantes plana y gzip.
+
+    Si el archivo no existe, `available` es False y el llamador decide qué
+    responder (normalmente una página 404 de respaldo).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._plain: Optional[bytes] = None
+        self._gzip: Optional[bytes] = None
+        self._plain_headers = {}
+        self._gzip_headers = {}
+
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            logger.warning(f"⚠️ Página estática no encontrada: {path}")
+            return
+
+        self._plain = re.sub(rb"\n[ \t]+", b"\n", raw)
+        self._gzip = gzip.compress(self._plain, compresslevel=9)
+
+        # no-cache obliga a revalidar siempre (304 barato), así un despliegue nuevo
+        # se ve de inmediato. Cada codificación tiene su propio ETag.
+        digest = hashlib.md5(self._plain).hexdigest()
+        self._plain_headers = {
+            "ETag": f'"{digest}"',
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        self._gzip_headers = {
+            **self._plain_headers,
+            "ETag": f'"{digest}-gzip"',
+            "Content-Encoding": "gzip",
+        }
+
+    @property
+    def available(self) -> bool:
+        return self._plain is not None
+
+    def response(self, request: Request) -> Response:
+        """Respuesta para la petición: 304 si el navegador ya la tiene, gzip si lo acepta"""
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            content, headers = self._gzip, self._gzip_headers
+        else:
+            content, headers = self._plain, self._plain_headers
+
+        if _etag_matches(request, headers["ETag"]):
+            return Response(status_code=304, headers={"ETag": headers["ETag"], "Vary": "Accept-Encoding"})
+        return Response(content=content, media_type="text/html", headers=headers)
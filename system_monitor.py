@@ -23,23 +23,106 @@ Este módulo es especialmente útil para:
 """
 
 import asyncio
-import json
+import logging
 import time
+import zlib
+import orjson
 import psutil
 import platform
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Any, Awaitable, Callable, Iterator, Optional, Set
+from dataclasses import dataclass, field
 from collections import deque
 from enum import Enum
+from functools import lru_cache
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse, FileResponse
+from websockets.exceptions import ConnectionClosed
 from logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Los broadcasts a partir de este tamaño se comprimen una sola vez con zlib y se
+# envían como frame binario (el navegador los abre con DecompressionStream("deflate"));
+# por debajo no compensa y se envían como texto JSON
+BROADCAST_COMPRESSION_MIN_BYTES = 1024
+BROADCAST_COMPRESSION_LEVEL = 3
+
+# Mensajes pendientes por cliente de monitoreo; si la cola se llena el cliente
+# es demasiado lento y se desconecta en lugar de frenar a los demás
+MONITOR_CLIENT_QUEUE_SIZE = 64
+
+# Errores esperables al escribir a un cliente que ya se fue (RuntimeError: Starlette
+# tras el cierre; OSError: socket cerrado / ClientDisconnected de uvicorn). No son
+# fallas del servidor: se registran sin traceback
+CLIENT_GONE_ERRORS = (WebSocketDisconnect, ConnectionClosed, OSError, RuntimeError)
+
+# Ventana deslizante para eventos por segundo: 10 buckets de 100 ms
+EVENT_RATE_BUCKETS_PER_SECOND = 10
+
+# Segundos sin datos tras los cuales el Arduino se considera inactivo
+ARDUINO_STALE_SECONDS = 10.0
+
+# Intervalo del heartbeat enviado a cada cliente del monitor de sistema
+MONITOR_HEARTBEAT_SECONDS = 30.0
+# Plantilla del heartbeat: solo el timestamp y los contadores cambian entre envíos
+HEARTBEAT_TEMPLATE = (
+    '{"type":"heartbeat","timestamp":"%s","system_status":"active",'
+    '"connections":{"water_monitor":%d,"admin":%d,"system_monitor":%d,'
+    '"arduino":%s,"total_web_clients":%d}}'
+)
+
+# Códigos de tipo de cliente WebSocket (índices de DistributedSystemMonitor._counts)
+CLIENT_WEB_MONITOR = 0
+CLIENT_ADMIN = 1
+CLIENT_SYSTEM = 2
+CLIENT_KINDS = {"monitor": CLIENT_WEB_MONITOR, "admin": CLIENT_ADMIN, "system_monitor": CLIENT_SYSTEM}
+
+# Clasificación del origen (source) de un evento para el logging educativo
+SOURCE_DASHBOARD = 0
+SOURCE_ADMIN = 1
+SOURCE_SYSTEM = 2
+SOURCE_ARDUINO = 3
+SOURCE_OTHER = 4
+
+# Plantillas de log por tipo de origen; reciben los conteos por tipo (counts) y el source
+_CONNECTION_LOGS = (
+    "🌊 Cliente del dashboard de agua conectado via WebSocket (total dashboard: {counts[0]})",
+    "🛠️ Panel de administración conectado via WebSocket (total admin: {counts[1]})",
+    "🔍 Monitor de sistema conectado para observabilidad (NO cuenta como cliente web)",
+    "🔗 Nueva conexión de tipo desconocido: {source}",
+    "🔗 Nueva conexión de tipo desconocido: {source}",
+)
+_DISCONNECTION_LOGS = (
+    "🔌 Cliente del dashboard desconectado (quedan {counts[0]} dashboard activos)",
+    "🛠️ Panel de administración desconectado (quedan {counts[1]} admin activos)",
+    "🔍 Monitor de sistema desconectado",
+    None,
+    None,
+)
+
+@lru_cache(maxsize=256)
+def _source_kind(source: str) -> int:
+    """
+    Clasifica el source de un evento una sola vez por valor distinto.
+    
+    Los sources son un conjunto pequeño de literales, así que tras la primera
+    llamada la clasificación es una búsqueda en caché en lugar de varias
+    búsquedas de subcadenas sobre source.lower() por evento.
+    """
+    source = source.lower()
+    if "websocket_monitor_websocket" in source:
+        return SOURCE_DASHBOARD
+    if "admin_websocket" in source:
+        return SOURCE_ADMIN
+    if "system_monitor" in source:
+        return SOURCE_SYSTEM
+    if "arduino" in source:
+        return SOURCE_ARDUINO
+    return SOURCE_OTHER
+
 class EventType(Enum):
     """Tipos de eventos del sistema"""
     CONNECTION = "connection"
@@ -49,7 +132,7 @@ class EventType(Enum):
     ERROR = "error"
     SYSTEM_METRIC = "system_metric"
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SystemEvent:
     """Evento del sistema con timestamp y detalles"""
     event_type: EventType
@@ -57,6 +140,8 @@ class SystemEvent:
     source: str
     details: Dict[str, Any]
     duration_ms: Optional[float] = None
+    # JSON del evento, serializado en la primera lectura y reutilizado después
+    _cached: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -66,8 +151,14 @@ class SystemEvent:
             "details": self.details,
             "duration_ms": self.duration_ms
         }
+    
+    def to_json(self) -> bytes:
+        """JSON del evento; los eventos no se modifican tras registrarse, así que se memoiza"""
+        if self._cached is None:
+            object.__setattr__(self, "_cached", orjson.dumps(self.to_dict(), default=str))
+        return self._cached
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SystemMetrics:
     """Métricas del sistema en tiempo real"""
     timestamp: datetime
@@ -77,6 +168,7 @@ class SystemMetrics:
     active_connections: int
     total_events: int
     events_per_second: float
+    _cached: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -88,6 +180,58 @@ class SystemMetrics:
             "total_events": self.total_events,
             "events_per_second": round(self.events_per_second, 2)
         }
+    
+    def to_json(self) -> bytes:
+        """JSON de la muestra, memoizado: se reenvía en broadcast, initial_state e historial"""
+        if self._cached is None:
+            object.__setattr__(self, "_cached", orjson.dumps(self.to_dict()))
+        return self._cached
+
+def _json_array(items) -> bytes:
+    """Arreglo JSON armado con los bytes ya serializados de cada evento o métrica"""
+    return b"[" + b",".join([item.to_json() for item in items]) + b"]"
+
+class RingBuffer:
+    """
+    Buffer circular de capacidad fija con almacenamiento preasignado.
+    
+    Reemplaza a deque(maxlen=N): append es O(1) sobre una lista contigua
+    y la iteración devuelve los elementos del más antiguo al más reciente.
+    """
+    
+    __slots__ = ("_items", "_capacity", "_head", "_size")
+    
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._items: List[Any] = [None] * capacity
+        self._head = 0   # Próxima posición de escritura
+        self._size = 0
+    
+    def append(self, item: Any):
+        self._items[self._head] = item
+        self._head = (self._head + 1) % self._capacity
+        if self._size < self._capacity:
+            self._size += 1
+    
+    def clear(self):
+        self._items = [None] * self._capacity
+        self._head = 0
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __iter__(self) -> Iterator[Any]:
+        return self.tail(self._size)
+    
+    def tail(self, count: int) -> Iterator[Any]:
+        """Últimos `count` elementos (del más antiguo al más reciente) sin copiar el buffer"""
+        count = min(count, self._size)
+        items = self._items
+        capacity = self._capacity
+        start = (self._head - count) % capacity
+        for offset in range(count):
+            yield items[(start + offset) % capacity]
 
 class DistributedSystemMonitor:
     """
@@ -101,13 +245,23 @@ class DistributedSystemMonitor:
     
     def __init__(self):
         # Almacén de eventos recientes
-        self.recent_events: deque = deque(maxlen=1000)
+        self.recent_events = RingBuffer(1000)
         
         # Separación clara entre tipos de conexiones
-        self.monitor_clients: List[WebSocket] = []  # Solo conexiones del sistema de monitoreo
+        # Solo conexiones del sistema de monitoreo: cada cliente tiene su cola acotada
+        # y una tarea escritora propia, así un cliente lento no bloquea al resto
+        self.monitor_clients: Dict[WebSocket, asyncio.Queue] = {}
+        self._writer_tasks: Dict[WebSocket, asyncio.Task] = {}
+        # Cierres de clientes lentos en curso: referencia fuerte hasta que terminan
+        self._close_tasks: Set[asyncio.Task] = set()
         
         # Métricas del sistema
-        self.metrics_history: deque = deque(maxlen=100)
+        self.metrics_history = RingBuffer(100)
+        
+        # Contador deslizante de eventos del último segundo: buckets [id_bucket, conteo]
+        # sobre reloj monotónico, para no recorrer el historial en cada ciclo de métricas
+        self._event_time_buckets: deque = deque()
+        self._events_last_second = 0
         
         # Contadores para estadísticas
         self.counters = {
@@ -121,13 +275,31 @@ class DistributedSystemMonitor:
         
         # Rastreo específico de conexiones por tipo
         self.connection_registry = {
-            "water_monitor_clients": set(),    # IDs únicos de clientes del dashboard de agua
-            "admin_clients": set(),            # IDs únicos de clientes admin  
-            "system_monitor_clients": set(),   # IDs únicos del sistema de monitoreo (NO se cuenta en active_connections)
-            "arduino_active": False,          # Estado del Arduino
-            "last_arduino_ping": None         # Última vez que Arduino envió datos
+            "arduino_active": False           # Estado del Arduino
         }
         
+        # ID de conexión -> código de tipo, y conteos por tipo indexados por ese código
+        # (alta/baja O(1), sin sets ni len() al construir cada evento)
+        self._conn_kind: Dict[str, int] = {}
+        self._counts: List[int] = [0, 0, 0]
+        # Último ping del Arduino ya formateado para el wire
+        self._last_ping_iso: Optional[str] = None
+        # Timer que marca al Arduino como inactivo si no llegan datos en la ventana;
+        # cada ping lo reprograma, así que no hace falta revisarlo en cada tick
+        self._arduino_stale_timer: Optional[asyncio.TimerHandle] = None
+        # Último log periódico de depuración de _broadcast_metrics (monotónico)
+        self._last_debug_log = float("-inf")
+        
+        # Snapshot serializado de "initial_state" compartido entre nuevos suscriptores;
+        # se invalida al cambiar la versión (nuevo evento o nueva métrica)
+        self._snapshot_version = 0
+        self._initial_snapshot: Optional[tuple] = None  # (versión, payload JSON)
+        
+        # Eventos pendientes de broadcast en la iteración actual del event loop;
+        # se envían juntos en un solo frame al final del tick
+        self._pending_events: List[SystemEvent] = []
+        self._flush_scheduled = False
+        
         # Información del sistema
         self.system_info = {
             "platform": platform.platform(),
@@ -137,6 +309,20 @@ class DistributedSystemMonitor:
             "start_time": datetime.now()
         }
         
+        # Parte estática de system_info ya serializable (start_time en ISO);
+        # solo uptime_seconds cambia entre envíos y se calcula con reloj monotónico
+        # Se serializa una vez, sin la llave de cierre, para empalmar el uptime
+        system_info_static = {
+            **self.system_info,
+            "start_time": self.system_info["start_time"].isoformat()
+        }
+        self._system_info_prefix = orjson.dumps(system_info_static)[:-1]
+        self._start_mono = time.monotonic()
+        
+        # Primera lectura de CPU: cpu_percent(None) mide contra la llamada anterior,
+        # así la primera muestra del ciclo ya es válida
+        psutil.cpu_percent(interval=None)
+        
         # Tarea de monitoreo de métricas
         self.metrics_task: Optional[asyncio.Task] = None
         
@@ -149,6 +335,61 @@ class DistributedSystemMonitor:
         timestamp = int(time.time() * 1000)
         return f"{client_type}_{client_host}_{client_port}_{timestamp}"
     
+    def get_system_info_json(self) -> bytes:
+        """system_info serializado: prefijo estático precalculado + uptime actual"""
+        uptime = time.monotonic() - self._start_mono
+        return self._system_info_prefix + b',"uptime_seconds":' + f"{uptime:.3f}".encode() + b"}"
+    
+    def _evict_event_buckets(self, bucket: int):
+        """Descarta los buckets que quedaron fuera de la ventana de 1 segundo"""
+        buckets = self._event_time_buckets
+        oldest_allowed = bucket - EVENT_RATE_BUCKETS_PER_SECOND + 1
+        while buckets and buckets[0][0] < oldest_allowed:
+            self._events_last_second -= buckets.popleft()[1]
+    
+    def _count_event(self, now: float):
+        """Suma un evento al bucket de 100 ms correspondiente a `now` (monotónico)"""
+        bucket = int(now * EVENT_RATE_BUCKETS_PER_SECOND)
+        self._evict_event_buckets(bucket)
+        buckets = self._event_time_buckets
+        if buckets and buckets[-1][0] == bucket:
+            buckets[-1][1] += 1
+        else:
+            buckets.append([bucket, 1])
+        self._events_last_second += 1
+    
+    def get_events_per_second(self) -> int:
+        """Eventos registrados en el último segundo, en O(1) amortizado"""
+        self._evict_event_buckets(int(time.monotonic() * EVENT_RATE_BUCKETS_PER_SECOND))
+        return self._events_last_second
+    
+    def get_initial_state_payload(self) -> str:
+        """
+        Payload JSON de "initial_state" para un nuevo cliente de monitoreo.
+        
+        Se serializa una sola vez por versión del estado: una ola de reconexiones
+        (p.ej. recarga de dashboards) reutiliza el mismo texto en lugar de
+        reconstruir y serializar los eventos y métricas para cada cliente.
+        El uptime incluido puede tener hasta un ciclo de métricas de antigüedad.
+        """
+        cached = self._initial_snapshot
+        if cached is not None and cached[0] == self._snapshot_version:
+            return cached[1]
+        
+        head = orjson.dumps({
+            "type": "initial_state",
+            "counters": self.counters,
+            "connection_states": self.get_connection_states()
+        })
+        # Eventos y métricas se insertan con sus bytes memoizados en lugar de re-serializarse
+        recent = _json_array(self.recent_events.tail(20))
+        history = _json_array(self.metrics_history.tail(10))
+        payload = (head[:-1] + b',"system_info":' + self.get_system_info_json()
+                   + b',"recent_events":' + recent
+                   + b',"metrics_history":' + history + b"}").decode()
+        self._initial_snapshot = (self._snapshot_version, payload)
+        return payload
+    
     def get_web_client_count(self) -> int:
         """
         NUEVO: Función específica para contar SOLO clientes web reales
@@ -156,35 +397,31 @@ class DistributedSystemMonitor:
         Returns:
             int: Número total de clientes web conectados (dashboard + admin, excluyendo sistema de monitoreo)
         """
-        return len(self.connection_registry["water_monitor_clients"]) + len(self.connection_registry["admin_clients"])
+        return self._counts[CLIENT_WEB_MONITOR] + self._counts[CLIENT_ADMIN]
     
     async def record_event(self, event: SystemEvent):
         """Registra un nuevo evento del sistema con logging educativo mejorado"""
         self.recent_events.append(event)
+        self._snapshot_version += 1
+        self._count_event(time.monotonic())
+        
+        kind = _source_kind(event.source)
+        log_info = logger.isEnabledFor(logging.INFO)
         
         # Actualizar contadores
         if event.event_type == EventType.CONNECTION:
             self.counters["total_connections"] += 1
             
             # Logging educativo específico con separación de tipos
-            if "websocket_monitor_websocket" in event.source.lower():
-                logger.info(f"🌊 Cliente del dashboard de agua conectado via WebSocket (total dashboard: {len(self.connection_registry['water_monitor_clients'])})")
-            elif "admin_websocket" in event.source.lower():
-                logger.info(f"🛠️ Panel de administración conectado via WebSocket (total admin: {len(self.connection_registry['admin_clients'])})")
-            elif "system_monitor" in event.source.lower():
-                logger.info(f"🔍 Monitor de sistema conectado para observabilidad (NO cuenta como cliente web)")
-            else:
-                logger.info(f"🔗 Nueva conexión de tipo desconocido: {event.source}")
+            if log_info:
+                logger.info(_CONNECTION_LOGS[kind].format(counts=self._counts, source=event.source))
                 
         elif event.event_type == EventType.DISCONNECTION:
             self.counters["total_disconnections"] += 1
             
-            if "websocket_monitor_websocket" in event.source.lower():
-                logger.info(f"🔌 Cliente del dashboard desconectado (quedan {len(self.connection_registry['water_monitor_clients'])} dashboard activos)")
-            elif "admin_websocket" in event.source.lower():
-                logger.info(f"🛠️ Panel de administración desconectado (quedan {len(self.connection_registry['admin_clients'])} admin activos)")
-            elif "system_monitor" in event.source.lower():
-                logger.info(f"🔍 Monitor de sistema desconectado")
+            template = _DISCONNECTION_LOGS[kind]
+            if template and log_info:
+                logger.info(template.format(counts=self._counts, source=event.source))
                 
         elif event.event_type in [EventType.DATA_RECEIVED, EventType.DATA_SENT]:
             self.counters["total_data_messages"] += 1
@@ -195,37 +432,42 @@ class DistributedSystemMonitor:
                     self.counters["bytes_received"] += event.details["bytes"]
                     
             # Logging educativo para datos con información de conexiones web
-            if event.event_type == EventType.DATA_RECEIVED and "arduino" in event.source.lower():
-                self.connection_registry["arduino_active"] = True
-                self.connection_registry["last_arduino_ping"] = datetime.now()
-                web_clients = self.get_web_client_count()
-                logger.info(f"📡 Datos del Arduino recibidos via HTTP POST: {event.details.get('bytes', 0)} bytes (distribuir a {web_clients} clientes web)")
+            if event.event_type == EventType.DATA_RECEIVED and kind == SOURCE_ARDUINO:
+                self._mark_arduino_ping(event.timestamp)
+                if log_info:
+                    web_clients = self.get_web_client_count()
+                    logger.info(f"📡 Datos del Arduino recibidos via HTTP POST: {event.details.get('bytes', 0)} bytes (distribuir a {web_clients} clientes web)")
                 
         elif event.event_type == EventType.ERROR:
             self.counters["total_errors"] += 1
             logger.warning(f"💥 Error en el sistema: {event.details.get('error', 'Error desconocido')}")
         
-        # Notificar a clientes conectados al sistema de monitoreo
-        await self._broadcast_event(event)
+        # Notificar a clientes conectados al sistema de monitoreo; sin suscriptores
+        # el evento nunca se serializa
+        if self.monitor_clients:
+            await self._broadcast_event(event)
         
-        logger.debug(f"📊 Evento registrado: {event.event_type.value} desde {event.source}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"📊 Evento registrado: {event.event_type.value} desde {event.source}")
     
     async def record_connection(self, websocket: WebSocket, client_type: str):
         """ Registra una nueva conexión con categorización apropiada"""
         connection_id = self.generate_connection_id(websocket, client_type)
 
         # Categorizar conexiones apropiadamente
-        if client_type == "monitor":
+        kind = CLIENT_KINDS.get(client_type)
+        if kind is not None and connection_id not in self._conn_kind:
+            self._conn_kind[connection_id] = kind
+            self._counts[kind] += 1
+
+        if kind == CLIENT_WEB_MONITOR:
             # Cliente del dashboard de agua (SÍ cuenta como cliente web)
-            self.connection_registry["water_monitor_clients"].add(connection_id)
             logger.info(f"👥 Cliente dashboard conectado: {connection_id[:8]}")
-        elif client_type == "admin":
+        elif kind == CLIENT_ADMIN:
             # Cliente del panel admin (SÍ cuenta como cliente web)
-            self.connection_registry["admin_clients"].add(connection_id)
             logger.info(f"🛠️ Cliente admin conectado: {connection_id[:8]}")
-        elif client_type == "system_monitor":
+        elif kind == CLIENT_SYSTEM:
             # Monitor de sistema (NO cuenta como cliente web)
-            self.connection_registry["system_monitor_clients"].add(connection_id)
             logger.info(f"🔍 Monitor de sistema conectado: {connection_id[:8]}")
         else:
             logger.warning(f"⚠️ Tipo de cliente desconocido: {client_type}")
@@ -242,11 +484,7 @@ class DistributedSystemMonitor:
                 "client_ip": getattr(websocket.client, 'host', 'unknown') if websocket.client else 'unknown',
                 "total_web_connections": web_client_count,
                 "is_web_client": client_type in ["monitor", "admin"],
-                "breakdown": {
-                    "dashboard_clients": len(self.connection_registry["water_monitor_clients"]),
-                    "admin_clients": len(self.connection_registry["admin_clients"]),
-                    "system_monitor_clients": len(self.connection_registry["system_monitor_clients"])
-                },
+                "breakdown": self._connection_breakdown(),
                 "topology_update": {
                     "node_type": "admin_node" if client_type == "admin" else "client_node" if client_type == "monitor" else "monitor_node",
                     "should_activate": True,
@@ -261,12 +499,9 @@ class DistributedSystemMonitor:
         """Registra una desconexión con categorización apropiada"""
         
         # Remover de la categoría apropiada
-        if client_type == "monitor" and connection_id in self.connection_registry["water_monitor_clients"]:
-            self.connection_registry["water_monitor_clients"].remove(connection_id)
-        elif client_type == "admin" and connection_id in self.connection_registry["admin_clients"]:
-            self.connection_registry["admin_clients"].remove(connection_id)
-        elif client_type == "system_monitor" and connection_id in self.connection_registry["system_monitor_clients"]:
-            self.connection_registry["system_monitor_clients"].remove(connection_id)
+        kind = self._conn_kind.pop(connection_id, None)
+        if kind is not None:
+            self._counts[kind] -= 1
             
         # Registrar evento con información detallada
         web_client_count = self.get_web_client_count()
@@ -279,20 +514,61 @@ class DistributedSystemMonitor:
                 "connection_id": connection_id,
                 "total_web_connections": web_client_count,  # Solo clientes web
                 "is_web_client": client_type in ["monitor", "admin"], 
-                "breakdown": {  # Desglose detallado
-                    "dashboard_clients": len(self.connection_registry["water_monitor_clients"]),
-                    "admin_clients": len(self.connection_registry["admin_clients"]),
-                    "system_monitor_clients": len(self.connection_registry["system_monitor_clients"])
-                }
+                "breakdown": self._connection_breakdown()  # Desglose detallado
             },
             duration_ms=duration_ms
         ))
     
-    async def record_arduino_data(self, data_size: int):
-        """Registra datos recibidos del Arduino"""
+    def _mark_arduino_ping(self, ping_time: datetime):
+        """Marca al Arduino como activo, guarda el ping en ISO y reprograma el timeout de inactividad"""
         self.connection_registry["arduino_active"] = True
-        self.connection_registry["last_arduino_ping"] = datetime.now()
+        self._last_ping_iso = ping_time.isoformat()
         
+        if self._arduino_stale_timer is not None:
+            self._arduino_stale_timer.cancel()
+        self._arduino_stale_timer = asyncio.get_running_loop().call_later(
+            ARDUINO_STALE_SECONDS, self._mark_arduino_stale
+        )
+    
+    def _mark_arduino_stale(self):
+        """Sin datos del Arduino durante la ventana de inactividad: marcarlo inactivo"""
+        self._arduino_stale_timer = None
+        self.connection_registry["arduino_active"] = False
+    
+    def _connection_breakdown(self) -> Dict[str, int]:
+        """Desglose de conexiones por tipo a partir de los conteos cacheados"""
+        return {
+            "dashboard_clients": self._counts[CLIENT_WEB_MONITOR],
+            "admin_clients": self._counts[CLIENT_ADMIN],
+            "system_monitor_clients": self._counts[CLIENT_SYSTEM]
+        }
+    
+    def get_connection_states(self) -> Dict[str, Any]:
+        """Snapshot de estados de conexión construido desde primitivas cacheadas"""
+        monitor_count = self._counts[CLIENT_WEB_MONITOR]
+        admin_count = self._counts[CLIENT_ADMIN]
+        system_count = self._counts[CLIENT_SYSTEM]
+        arduino_active = self.connection_registry["arduino_active"]
+        return {
+            "arduino_active": arduino_active,
+            # Información detallada y precisa sobre conexiones
+            "water_monitor_clients": monitor_count,
+            "admin_clients": admin_count,
+            "system_monitor_clients": system_count,
+            "total_web_clients": monitor_count + admin_count,
+            "last_arduino_ping": self._last_ping_iso,
+            # Información adicional para debugging de topología
+            "connection_breakdown": {
+                "monitor_active": monitor_count > 0,
+                "admin_active": admin_count > 0,
+                "arduino_active": arduino_active,
+                "system_monitor_active": system_count > 0
+            }
+        }
+    
+    async def record_arduino_data(self, data_size: int):
+        """Registra datos recibidos del Arduino"""
+        # record_event marca el ping del Arduino (una sola vez por dato)
         await self.record_event(SystemEvent(
             event_type=EventType.DATA_RECEIVED,
             timestamp=datetime.now(),
@@ -306,26 +582,143 @@ class DistributedSystemMonitor:
         ))
     
     async def _broadcast_event(self, event: SystemEvent):
-        """Envía el evento a todos los clientes conectados del sistema de monitoreo"""
+        """
+        Agenda el evento para los clientes conectados del sistema de monitoreo.
+        
+        Los eventos registrados dentro de la misma iteración del event loop se
+        agrupan y salen en un único frame, en lugar de un envío por evento.
+        """
         if not self.monitor_clients:
             return
         
-        event_data = {
-            "type": "system_event",
-            "event": event.to_dict()
-        }
+        self._pending_events.append(event)
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush_event_batch)
+    
+    def _flush_event_batch(self):
+        """Serializa (y comprime) una sola vez los eventos acumulados del tick y los encola"""
+        events, self._pending_events = self._pending_events, []
+        self._flush_scheduled = False
+        if not events or not self.monitor_clients:
+            return
         
-        disconnected_clients = []
-        for client in self.monitor_clients:
+        if len(events) == 1:
+            payload = b'{"type":"system_event","event":' + events[0].to_json() + b"}"
+        else:
+            payload = b'{"type":"system_event_batch","events":' + _json_array(events) + b"}"
+        self._enqueue_for_monitor_clients(self._pack_broadcast(payload))
+    
+    @staticmethod
+    def _sample_sync() -> tuple:
+        """
+        Lectura síncrona de psutil (lecturas de /proc), pensada para un hilo.
+        
+        Devuelve solo valores primitivos ya extraídos: el hilo hace todo el trabajo
+        de psutil y el event loop solo recibe (cpu %, memoria %, dict de red).
+        """
+        # interval=None no duerme: devuelve el % de CPU desde la muestra anterior,
+        # y el ciclo de 2 s de collect_system_metrics hace de ventana de medición
+        network = psutil.net_io_counters()
+        return (
+            psutil.cpu_percent(interval=None),
+            psutil.virtual_memory().percent,
+            {
+                "bytes_sent": network.bytes_sent,
+                "bytes_recv": network.bytes_recv,
+                "packets_sent": network.packets_sent,
+                "packets_recv": network.packets_recv
+            }
+        )
+    
+    @staticmethod
+    def _pack_broadcast(payload: bytes):
+        """
+        Prepara un broadcast ya serializado para el wire, una sola vez para todos.
+        
+        Returns:
+            str con el JSON para payloads pequeños, o bytes zlib para los grandes
+        """
+        if len(payload) < BROADCAST_COMPRESSION_MIN_BYTES:
+            return payload.decode()
+        return zlib.compress(payload, BROADCAST_COMPRESSION_LEVEL)
+    
+    @staticmethod
+    async def _send_message(websocket: WebSocket, message):
+        """Envía un mensaje ya codificado: texto JSON o frame binario comprimido"""
+        if isinstance(message, bytes):
+            await websocket.send_bytes(message)
+        else:
+            await websocket.send_text(message)
+    
+    def _enqueue_for_monitor_clients(self, message):
+        """
+        Encola un mensaje ya codificado para todos los clientes sin esperar envíos.
+        
+        El broadcast tarda lo mismo sin importar cuántos clientes haya o qué tan
+        lentos sean; cada tarea escritora entrega a su propio ritmo.
+        """
+        slow_clients = []
+        for client, queue in self.monitor_clients.items():
             try:
-                await client.send_json(event_data)
-            except Exception as e:
-                logger.warning(f"🔌 Cliente de monitor desconectado: {str(e)}")
-                disconnected_clients.append(client)
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                slow_clients.append(client)
         
-        # Limpiar clientes desconectados
-        for client in disconnected_clients:
-            self.monitor_clients.remove(client)
+        for client in slow_clients:
+            logger.warning("🐢 Cliente de monitor demasiado lento (cola llena), desconectando")
+            self.remove_monitor_client(client)
+            close_task = asyncio.create_task(self._close_slow_client(client))
+            self._close_tasks.add(close_task)
+            close_task.add_done_callback(self._close_tasks.discard)
+    
+    @staticmethod
+    async def _close_slow_client(websocket: WebSocket):
+        """Cierra un cliente lento con código 1013 (intentar más tarde)"""
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+    
+    async def _client_writer(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Tarea escritora de un cliente: drena su cola y envía en orden"""
+        try:
+            while True:
+                message = await queue.get()
+                await self._send_message(websocket, message)
+        except CLIENT_GONE_ERRORS as e:
+            logger.info(f"🔌 Cliente de monitor desconectado: {str(e) or type(e).__name__}")
+        except Exception:
+            logger.exception("💥 Error inesperado enviando a cliente de monitor")
+        finally:
+            # La tarea se da de baja sola por identidad (O(1)); si ya fue reemplazada
+            # o removida, no toca el registro
+            if self._writer_tasks.get(websocket) is asyncio.current_task():
+                self.remove_monitor_client(websocket)
+    
+    def get_heartbeat_payload(self) -> str:
+        """Heartbeat con el estado actual de conexiones, armado sobre una plantilla fija"""
+        monitor, admin, system = self._counts
+        arduino = "true" if self.connection_registry["arduino_active"] else "false"
+        return HEARTBEAT_TEMPLATE % (
+            datetime.now().isoformat(), monitor, admin, system, arduino, monitor + admin
+        )
+    
+    async def _heartbeat(self, websocket: WebSocket):
+        """Tarea de heartbeat de una conexión: encola un latido cada intervalo"""
+        while True:
+            await asyncio.sleep(MONITOR_HEARTBEAT_SECONDS)
+            queue = self.monitor_clients.get(websocket)
+            if queue is None:
+                return
+            try:
+                queue.put_nowait(self.get_heartbeat_payload())
+            except asyncio.QueueFull:
+                logger.info("💔 Conexión de monitoreo perdida (heartbeat sin espacio en cola)")
+                self.remove_monitor_client(websocket)
+                await self._close_slow_client(websocket)
+                return
+            logger.debug("🏓 Heartbeat enviado al cliente de monitoreo")
     
     async def collect_system_metrics(self):
         """Recolecta métricas del sistema en tiempo real"""
@@ -333,45 +726,32 @@ class DistributedSystemMonitor:
         
         while True:
             try:
-                # Obtener métricas del sistema
-                cpu_percent = psutil.cpu_percent(interval=1)
-                memory = psutil.virtual_memory()
-                network = psutil.net_io_counters()
+                # Obtener métricas del sistema fuera del event loop
+                cpu_percent, memory_percent, network_io = await asyncio.to_thread(self._sample_sync)
                 
-                # Calcular eventos por segundo
+                # Eventos por segundo desde el contador deslizante
                 current_time = datetime.now()
-                events_in_last_second = len([
-                    e for e in self.recent_events 
-                    if (current_time - e.timestamp).total_seconds() <= 1
-                ])
+                events_in_last_second = self.get_events_per_second()
                 
                 # Contar SOLO conexiones web reales, excluyendo sistema de monitoreo
                 active_web_connections = self.get_web_client_count()
                 
-                # Verificar si Arduino sigue activo (timeout de 10 segundos)
-                if (self.connection_registry["last_arduino_ping"] and 
-                    (current_time - self.connection_registry["last_arduino_ping"]).total_seconds() > 10):
-                    self.connection_registry["arduino_active"] = False
-                
                 metrics = SystemMetrics(
                     timestamp=current_time,
                     cpu_percent=cpu_percent,
-                    memory_percent=memory.percent,
-                    network_io={
-                        "bytes_sent": network.bytes_sent,
-                        "bytes_recv": network.bytes_recv,
-                        "packets_sent": network.packets_sent,
-                        "packets_recv": network.packets_recv
-                    },
+                    memory_percent=memory_percent,
+                    network_io=network_io,
                     active_connections=active_web_connections,  # Solo clientes web
                     total_events=len(self.recent_events),
                     events_per_second=events_in_last_second
                 )
                 
                 self.metrics_history.append(metrics)
+                self._snapshot_version += 1
                 
-                # Enviar métricas a clientes del sistema de monitoreo
-                await self._broadcast_metrics(metrics)
+                # Enviar métricas a clientes del sistema de monitoreo (solo si hay alguno)
+                if self.monitor_clients:
+                    await self._broadcast_metrics(metrics)
                 
                 # Esperar antes de la siguiente recolección
                 await asyncio.sleep(2)
@@ -388,59 +768,38 @@ class DistributedSystemMonitor:
         if not self.monitor_clients:
             return
 
-        metrics_data = {
+        metrics_data = orjson.dumps({
             "type": "system_metrics",
-            "metrics": metrics.to_dict(),
             "counters": self.counters,
-            "connection_states": {
-                "arduino_active": self.connection_registry["arduino_active"],
-                # Información detallada y precisa sobre conexiones
-                "water_monitor_clients": len(self.connection_registry["water_monitor_clients"]),
-                "admin_clients": len(self.connection_registry["admin_clients"]),
-                "system_monitor_clients": len(self.connection_registry["system_monitor_clients"]),
-                "total_web_clients": self.get_web_client_count(),
-                "last_arduino_ping": self.connection_registry["last_arduino_ping"].isoformat() if self.connection_registry["last_arduino_ping"] else None,
-                # Información adicional para debugging de topología
-                "connection_breakdown": {
-                    "monitor_active": len(self.connection_registry["water_monitor_clients"]) > 0,
-                    "admin_active": len(self.connection_registry["admin_clients"]) > 0,
-                    "arduino_active": self.connection_registry["arduino_active"],
-                    "system_monitor_active": len(self.connection_registry["system_monitor_clients"]) > 0
-                }
-            },
-            "system_info": {
-                **self.system_info,
-                "start_time": self.system_info["start_time"].isoformat(),
-                "uptime_seconds": (datetime.now() - self.system_info["start_time"]).total_seconds()
-            }
-        }
-
-        disconnected_clients = []
-        for client in self.monitor_clients:
-            try:
-                await client.send_json(metrics_data)
-            except Exception:
-                disconnected_clients.append(client)
+            "connection_states": self.get_connection_states()
+        })
+        payload = (metrics_data[:-1] + b',"metrics":' + metrics.to_json()
+                   + b',"system_info":' + self.get_system_info_json() + b"}")
 
-        # Limpiar clientes desconectados
-        for client in disconnected_clients:
-            self.monitor_clients.remove(client)
+        self._enqueue_for_monitor_clients(self._pack_broadcast(payload))
 
         # Log periódico para debugging (cada 30 segundos)
-        current_time = datetime.now()
-        if not hasattr(self, '_last_debug_log') or (current_time - self._last_debug_log).total_seconds() > 30:
-            self._last_debug_log = current_time
-            logger.debug(f"📊 Estado de conexiones: Monitor={len(self.connection_registry['water_monitor_clients'])}, Admin={len(self.connection_registry['admin_clients'])}, Arduino={'✅' if self.connection_registry['arduino_active'] else '❌'}")
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        now = time.monotonic()
+        if now - self._last_debug_log > 30:
+            self._last_debug_log = now
+            logger.debug(f"📊 Estado de conexiones: Monitor={self._counts[CLIENT_WEB_MONITOR]}, Admin={self._counts[CLIENT_ADMIN]}, Arduino={'✅' if self.connection_registry['arduino_active'] else '❌'}")
     
     def add_monitor_client(self, websocket: WebSocket):
         """Registra un nuevo cliente de monitoreo del sistema (NO es cliente web)"""
-        self.monitor_clients.append(websocket)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=MONITOR_CLIENT_QUEUE_SIZE)
+        self.monitor_clients[websocket] = queue
+        self._writer_tasks[websocket] = asyncio.create_task(self._client_writer(websocket, queue))
         logger.info(f"🔍 Cliente de monitoreo de SISTEMA conectado. Monitor clients: {len(self.monitor_clients)} (NO cuenta como cliente web)")
     
     def remove_monitor_client(self, websocket: WebSocket):
         """Remueve un cliente de monitoreo del sistema"""
         if websocket in self.monitor_clients:
-            self.monitor_clients.remove(websocket)
+            del self.monitor_clients[websocket]
+            writer = self._writer_tasks.pop(websocket, None)
+            if writer and writer is not asyncio.current_task():
+                writer.cancel()
             logger.info(f"🔍 Cliente de monitoreo de SISTEMA desconectado. Monitor clients: {len(self.monitor_clients)}")
     
     async def start_monitoring(self):
@@ -465,10 +824,65 @@ class DistributedSystemMonitor:
                 await self.metrics_task
             except asyncio.CancelledError:
                 logger.info("✅ Monitoreo de sistema detenido")
+        
+        # Cancelar las tareas escritoras (y cierres de clientes lentos) que queden y esperar a que terminen
+        writers = [*self._writer_tasks.values(), *self._close_tasks]
+        for writer in writers:
+            writer.cancel()
+        if writers:
+            await asyncio.gather(*writers, return_exceptions=True)
 
 # Instancia global del monitor
 system_monitor = DistributedSystemMonitor()
 
+async def _send_full_history(websocket: WebSocket, monitor: DistributedSystemMonitor, command: Dict[str, Any], message_bytes: int):
+    """Comando get_full_history: envía el historial completo de eventos y métricas"""
+    # Concatenación de bytes: cada evento y métrica ya trae su JSON memoizado;
+    # el mismo buffer se envía y se mide
+    payload = (b'{"type":"full_history","events":' + _json_array(monitor.recent_events)
+               + b',"metrics":' + _json_array(monitor.metrics_history) + b"}")
+    await websocket.send_text(payload.decode())
+    
+    # Log educativo
+    await monitor.record_event(SystemEvent(
+        event_type=EventType.DATA_SENT,
+        timestamp=datetime.now(),
+        source="system_monitor",
+        details={
+            "action": "full_history_sent",
+            "events_count": len(monitor.recent_events),
+            "metrics_count": len(monitor.metrics_history),
+            "bytes": len(payload),
+            "command_bytes": message_bytes,
+            "protocol": "WebSocket",
+            "web_clients_active": monitor.get_web_client_count() 
+        }
+    ))
+
+async def _clear_events(websocket: WebSocket, monitor: DistributedSystemMonitor, command: Dict[str, Any], message_bytes: int):
+    """Comando clear_events: limpia los eventos (solo para testing)"""
+    monitor.recent_events.clear()
+    await websocket.send_text(orjson.dumps({"type": "events_cleared"}).decode())
+    
+    await monitor.record_event(SystemEvent(
+        event_type=EventType.DATA_RECEIVED,
+        timestamp=datetime.now(),
+        source="system_monitor",
+        details={
+            # Sin "bytes": limpiar eventos no debe mover los contadores de tráfico
+            "action": "events_cleared_by_user",
+            "protocol": "WebSocket"
+        }
+    ))
+
+# Tabla de comandos del cliente de monitoreo: una búsqueda por mensaje en lugar
+# de una cadena de if/elif; agregar un comando no toca el loop del WebSocket.
+# Cada handler registra su propio evento (recibe el tamaño del mensaje por si lo incluye)
+_CMD_HANDLERS: Dict[str, Callable[[WebSocket, DistributedSystemMonitor, Dict[str, Any], int], Awaitable[None]]] = {
+    "get_full_history": _send_full_history,
+    "clear_events": _clear_events,
+}
+
 async def system_monitor_websocket(websocket: WebSocket):
     """
     WebSocket para Monitoreo del Sistema Distribuido - CORREGIDO
@@ -483,76 +897,26 @@ async def system_monitor_websocket(websocket: WebSocket):
     # Registrar como conexión del sistema de monitoreo (no cliente web)
     connection_id = await system_monitor.record_connection(websocket, "system_monitor")
     
-    connection_start_time = time.time()
+    connection_start_time = time.monotonic()
+    # Un heartbeat de larga vida por conexión en lugar de un wait_for por mensaje
+    heartbeat_task = asyncio.create_task(system_monitor._heartbeat(websocket))
     
     try:
-        # Enviar datos iniciales
-        initial_data = {
-            "type": "initial_state",
-            "system_info": {
-                **system_monitor.system_info,
-                "start_time": system_monitor.system_info["start_time"].isoformat(),
-                "uptime_seconds": (datetime.now() - system_monitor.system_info["start_time"]).total_seconds()
-            },
-            "counters": system_monitor.counters,
-            "connection_states": {
-                "arduino_active": system_monitor.connection_registry["arduino_active"],
-                # Información precisa sobre tipos de conexiones
-                "water_monitor_clients": len(system_monitor.connection_registry["water_monitor_clients"]),
-                "admin_clients": len(system_monitor.connection_registry["admin_clients"]),
-                "system_monitor_clients": len(system_monitor.connection_registry["system_monitor_clients"]),
-                "total_web_clients": system_monitor.get_web_client_count(),  # NUEVO
-            },
-            "recent_events": [event.to_dict() for event in list(system_monitor.recent_events)[-20:]],
-            "metrics_history": [metrics.to_dict() for metrics in list(system_monitor.metrics_history)[-10:]]
-        }
-        await websocket.send_json(initial_data)
+        # Enviar datos iniciales (snapshot compartido entre suscriptores)
+        await websocket.send_text(system_monitor.get_initial_state_payload())
         
-        # Mantener conexión activa
-        while True:
+        # Mantener conexión activa (iter_text termina al desconectarse el cliente)
+        async for message in websocket.iter_text():
+            # Procesar comandos del cliente
             try:
-                message = await asyncio.wait_for(websocket.receive_text(), timeout=30.0)
+                command = orjson.loads(message)
                 
-                # Procesar comandos del cliente
-                try:
-                    command = json.loads(message)
-                    
-                    if command.get("action") == "get_full_history":
-                        # Enviar historial completo
-                        history_data = {
-                            "type": "full_history",
-                            "events": [event.to_dict() for event in system_monitor.recent_events],
-                            "metrics": [metrics.to_dict() for metrics in system_monitor.metrics_history]
-                        }
-                        await websocket.send_json(history_data)
-                        
-                        # Log educativo
-                        await system_monitor.record_event(SystemEvent(
-                            event_type=EventType.DATA_SENT,
-                            timestamp=datetime.now(),
-                            source="system_monitor",
-                            details={
-                                "action": "full_history_sent",
-                                "events_count": len(system_monitor.recent_events),
-                                "metrics_count": len(system_monitor.metrics_history),
-                                "bytes": len(json.dumps(history_data)),
-                                "web_clients_active": system_monitor.get_web_client_count() 
-                            }
-                        ))
-                        
-                    elif command.get("action") == "clear_events":
-                        # Limpiar eventos (solo para testing)
-                        system_monitor.recent_events.clear()
-                        await websocket.send_json({"type": "events_cleared"})
-                        
-                        await system_monitor.record_event(SystemEvent(
-                            event_type=EventType.DATA_RECEIVED,
-                            timestamp=datetime.now(),
-                            source="system_monitor",
-                            details={"action": "events_cleared_by_user"}
-                        ))
-                    
-                    # Registrar evento de comando recibido
+                handler = _CMD_HANDLERS.get(command.get("action"))
+                if handler:
+                    # El handler registra su propio evento (con bytes y protocolo)
+                    await handler(websocket, system_monitor, command, len(message))
+                else:
+                    # Registrar evento de comando recibido (solo acciones desconocidas)
                     await system_monitor.record_event(SystemEvent(
                         event_type=EventType.DATA_RECEIVED,
                         timestamp=datetime.now(),
@@ -564,39 +928,23 @@ async def system_monitor_websocket(websocket: WebSocket):
                             "explanation": "Cliente del sistema de monitoreo usa WebSocket para comandos interactivos"
                         }
                     ))
-                    
-                except json.JSONDecodeError:
+                
+            except orjson.JSONDecodeError:
+                if logger.isEnabledFor(logging.WARNING):
                     logger.warning(f"🚨 JSON inválido del cliente monitor: {message}")
-                    
-            except asyncio.TimeoutError:
-                # Verificar que la conexión sigue activa enviando un mensaje de heartbeat
-                try:
-                    await websocket.send_json({
-                        "type": "heartbeat",
-                        "timestamp": datetime.now().isoformat(),
-                        "system_status": "active",
-                        "connections": {
-                            "water_monitor": len(system_monitor.connection_registry["water_monitor_clients"]),
-                            "admin": len(system_monitor.connection_registry["admin_clients"]),
-                            "system_monitor": len(system_monitor.connection_registry["system_monitor_clients"]),
-                            "arduino": system_monitor.connection_registry["arduino_active"],
-                            "total_web_clients": system_monitor.get_web_client_count()  # NUEVO
-                        }
-                    })
-                    logger.debug("🏓 Heartbeat enviado al cliente de monitoreo")
-                except:
-                    logger.info("💔 Conexión de monitoreo perdida (heartbeat falló)")
-                    break
+        
+        logger.info("🔌 Cliente de monitoreo desconectado")
                 
     except WebSocketDisconnect:
         logger.info("🔌 Cliente de monitoreo desconectado")
     except Exception as e:
         logger.error(f"💥 Error en WebSocket de monitoreo: {str(e)}")
     finally:
+        heartbeat_task.cancel()
         system_monitor.remove_monitor_client(websocket)
         
         # Registrar evento de desconexión con duración
-        duration = (time.time() - connection_start_time) * 1000
+        duration = (time.monotonic() - connection_start_time) * 1000
         await system_monitor.record_disconnection(connection_id, "system_monitor", duration)
 
 async def get_system_monitor_page():
@@ -625,25 +973,23 @@ def integrate_system_monitor(app: FastAPI):
     async def system_monitor_ws_route(websocket: WebSocket):
         """WebSocket del monitor de sistema"""
         await system_monitor_websocket(websocket)
-    
-    @app.on_event("startup")
-    async def start_system_monitoring():
-        """Iniciar monitoreo del sistema"""
-        await system_monitor.start_monitoring()
-        logger.info("🔍 Sistema de monitoreo integrado e iniciado con conteo de conexiones corregido")
-    
-    @app.on_event("shutdown")
-    async def stop_system_monitoring():
-        """Detener monitoreo del sistema"""
-        await system_monitor.stop_monitoring()
-        logger.info("🔍 Sistema de monitoreo detenido")
+
+async def start_system_monitoring():
+    """Iniciar monitoreo del sistema (llamado desde el lifespan de main.py)"""
+    await system_monitor.start_monitoring()
+    logger.info("🔍 Sistema de monitoreo integrado e iniciado con conteo de conexiones corregido")
+
+async def stop_system_monitoring():
+    """Detener monitoreo del sistema (llamado desde el lifespan de main.py)"""
+    await system_monitor.stop_monitoring()
+    logger.info("🔍 Sistema de monitoreo detenido")
 
 def monitor_websocket_events(func):
     """
     Decorador para monitorear automáticamente eventos de WebSocket - CORREGIDO
     """
     async def wrapper(websocket: WebSocket, *args, **kwargs):
-        start_time = time.time()
+        start_time = time.monotonic()
         client_type = "unknown"
         connection_id = None
         
@@ -678,7 +1024,7 @@ def monitor_websocket_events(func):
         finally:
             # Registrar desconexión
             if connection_id:
-                duration = (time.time() - start_time) * 1000
+                duration = (time.monotonic() - start_time) * 1000
                 await system_monitor.record_disconnection(connection_id, client_type, duration)
     
     return wrapper
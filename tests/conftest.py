@@ -0,0 +1,5 @@
+"""Configuración de pytest: los módulos de la aplicación viven en la raíz del repo"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
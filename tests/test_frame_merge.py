@@ -0,0 +1,35 @@
+"""Pruebas de la combinación de frames acumulados en la cola de un cliente"""
+from water_monitor import MULTI_PREFIX, MULTI_SUFFIX, _latest_snapshot, _merge_readings
+
+READING_1 = '{"T":1.0,"PH":7.0,"C":100.0}'
+READING_2 = '{"T":2.0,"PH":7.1,"C":110.0}'
+READING_3 = '{"T":3.0,"PH":7.2,"C":120.0}'
+HEARTBEAT = '{"type":"heartbeat","server_status":"active"}'
+
+
+def multi(*readings):
+    return MULTI_PREFIX + ",".join(readings) + MULTI_SUFFIX
+
+
+def test_merge_readings_builds_one_multi_frame():
+    assert _merge_readings([READING_1, READING_2]) == [multi(READING_1, READING_2)]
+
+
+def test_merge_readings_flattens_existing_multi_frames():
+    merged = _merge_readings([multi(READING_1, READING_2), READING_3])
+    assert merged == [multi(READING_1, READING_2, READING_3)]
+
+
+def test_merge_readings_keeps_single_reading_unchanged():
+    assert _merge_readings([READING_1]) == [READING_1]
+
+
+def test_merge_readings_keeps_other_frames_in_place():
+    merged = _merge_readings([READING_1, READING_2, HEARTBEAT, READING_3])
+    assert merged == [multi(READING_1, READING_2), HEARTBEAT, READING_3]
+
+
+def test_latest_snapshot_keeps_only_last():
+    assert _latest_snapshot(['{"type":"system_update","n":1}', '{"type":"system_update","n":2}']) == [
+        '{"type":"system_update","n":2}'
+    ]
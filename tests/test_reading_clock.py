@@ -0,0 +1,44 @@
+"""Pruebas del reloj de baja resolución para las marcas de tiempo de las lecturas"""
+from datetime import datetime
+
+import water_monitor
+from water_monitor import ReadingClock
+
+BASE = 1_700_000_000.0
+
+
+def freeze_time(monkeypatch, value):
+    monkeypatch.setattr(water_monitor.time, "time", lambda: value)
+
+
+def test_same_tick_returns_same_object(monkeypatch):
+    clock = ReadingClock()
+    freeze_time(monkeypatch, BASE + 0.01)
+    first = clock.now()
+    freeze_time(monkeypatch, BASE + 0.09)
+    assert clock.now() is first
+
+
+def test_new_tick_builds_new_datetime(monkeypatch):
+    clock = ReadingClock()
+    freeze_time(monkeypatch, BASE + 0.05)
+    first = clock.now()
+    freeze_time(monkeypatch, BASE + 0.15)
+    second = clock.now()
+    assert second is not first
+    assert (second - first).total_seconds() == 0.1
+
+
+def test_timestamp_is_truncated_to_tick(monkeypatch):
+    clock = ReadingClock()
+    freeze_time(monkeypatch, BASE + 0.37)
+    assert clock.now() == datetime.fromtimestamp(BASE).replace(microsecond=300_000)
+
+
+def test_custom_resolution(monkeypatch):
+    clock = ReadingClock(ticks_per_second=1)
+    freeze_time(monkeypatch, BASE + 0.2)
+    first = clock.now()
+    freeze_time(monkeypatch, BASE + 0.9)
+    assert clock.now() is first
+    assert first.microsecond == 0
@@ -0,0 +1,45 @@
+"""Pruebas del buffer circular de system_monitor"""
+from system_monitor import RingBuffer
+
+
+def test_empty_buffer():
+    buffer = RingBuffer(3)
+    assert len(buffer) == 0
+    assert list(buffer) == []
+    assert list(buffer.tail(5)) == []
+
+
+def test_append_below_capacity_keeps_order():
+    buffer = RingBuffer(3)
+    buffer.append(1)
+    buffer.append(2)
+    assert len(buffer) == 2
+    assert list(buffer) == [1, 2]
+
+
+def test_wraps_around_dropping_oldest():
+    buffer = RingBuffer(3)
+    for item in range(5):
+        buffer.append(item)
+    assert len(buffer) == 3
+    assert list(buffer) == [2, 3, 4]
+
+
+def test_tail_returns_latest_oldest_first():
+    buffer = RingBuffer(4)
+    for item in range(6):
+        buffer.append(item)
+    assert list(buffer.tail(2)) == [4, 5]
+    assert list(buffer.tail(10)) == [2, 3, 4, 5]
+    assert list(buffer.tail(0)) == []
+
+
+def test_clear_resets_buffer():
+    buffer = RingBuffer(2)
+    buffer.append("a")
+    buffer.append("b")
+    buffer.clear()
+    assert len(buffer) == 0
+    assert list(buffer) == []
+    buffer.append("c")
+    assert list(buffer) == ["c"]
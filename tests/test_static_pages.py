@@ -0,0 +1,37 @@
+"""Pruebas de la revalidación con ETag de las páginas estáticas en memoria"""
+from starlette.requests import Request
+
+from static_pages import _etag_matches
+
+ETAG = '"abc123"'
+
+
+def make_request(if_none_match=None):
+    headers = []
+    if if_none_match is not None:
+        headers.append((b"if-none-match", if_none_match.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_no_header_does_not_match():
+    assert not _etag_matches(make_request(), ETAG)
+
+
+def test_exact_etag_matches():
+    assert _etag_matches(make_request(ETAG), ETAG)
+
+
+def test_weak_etag_matches():
+    assert _etag_matches(make_request("W/" + ETAG), ETAG)
+
+
+def test_wildcard_matches():
+    assert _etag_matches(make_request("*"), ETAG)
+
+
+def test_comma_separated_list_matches():
+    assert _etag_matches(make_request('"other", W/"abc123"'), ETAG)
+
+
+def test_different_etag_does_not_match():
+    assert not _etag_matches(make_request('"other", W/"xyz"'), ETAG)
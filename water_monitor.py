@@ -44,20 +44,26 @@ Arquitectura de Comunicación:
 
 """
 
-import json
 import asyncio
+import orjson
+import msgspec
 import random
 import os
+import socket
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import Callable, Dict, List, Any, Optional, Set
+from dataclasses import dataclass, field
 from enum import Enum
+from collections import deque
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse, Response
+from fastapi.responses import HTMLResponse, Response
 from logging_config import get_logger
-from system_monitor import system_monitor, SystemEvent, EventType, monitor_websocket_events
+from static_pages import CachedPage
+from system_monitor import (
+    system_monitor, SystemEvent, EventType, monitor_websocket_events, CLIENT_GONE_ERRORS
+)
 
 logger = get_logger(__name__)
 
@@ -69,41 +75,327 @@ MOCK_DATA_CONFIG = {
     "conductivity_range": (100, 1200)
 }
 
+# Intervalo mínimo entre broadcasts: las lecturas que llegan dentro de la ventana
+# se agrupan y se envían juntas en un solo frame ("multi"). Es el techo de frames
+# por segundo hacia los clientes sin importar a qué ritmo publique el Arduino.
+MIN_BROADCAST_INTERVAL_SECONDS = float(os.getenv("MIN_BROADCAST_INTERVAL_SECONDS", "0.25"))
+# Máximo de lecturas pendientes por ventana; si se excede se conservan las más recientes
+MAX_PENDING_READINGS = 64
+# Sobre del frame "multi"; se arma por concatenación con lecturas ya serializadas
+MULTI_PREFIX = '{"type":"multi","payload":['
+MULTI_SUFFIX = ']}'
+# Inicio de los frames que llevan lecturas (sueltas o en sobre "multi"); el resto
+# (snapshots admin en /ws) no cuenta como envío de datos de sensores
+READING_FRAME_PREFIXES = ('{"T":', MULTI_PREFIX)
+
+# Bus pub/sub opcional entre workers: con REDIS_URL definido, cada lectura se
+# publica en Redis y todos los workers (incluido el que la recibió) la distribuyen
+# a sus propios WebSockets. Sin REDIS_URL todo queda en el proceso actual.
+REDIS_URL = os.getenv("REDIS_URL")
+REDIS_CHANNEL = os.getenv("REDIS_CHANNEL", "water:latest")
+# Lease del generador mock: solo el worker que lo tiene genera datos simulados.
+# Se renueva en cada tick; si ese worker muere, otro lo toma al vencer
+MOCK_LEADER_TTL_MS = int(MOCK_DATA_CONFIG["interval_seconds"] * 3 * 1000)
+# Reintentos de la suscripción pub/sub si se cae la conexión con Redis (backoff exponencial)
+REDIS_RECONNECT_BASE_SECONDS = 0.5
+REDIS_RECONNECT_MAX_SECONDS = 30.0
+
+# Temas del WebSocket multiplexado /ws: un mismo socket puede recibir las lecturas
+# del dashboard y/o las estadísticas del panel admin
+TOPIC_READINGS = "readings"
+TOPIC_ADMIN_STATS = "admin_stats"
+WS_TOPICS = frozenset({TOPIC_READINGS, TOPIC_ADMIN_STATS})
+# Tiempo máximo para recibir el mensaje {"subscribe": [...]} tras conectar a /ws
+SUBSCRIBE_TIMEOUT_SECONDS = 10.0
+
+# Intervalo de heartbeat hacia los clientes de monitoreo
+MONITOR_HEARTBEAT_SECONDS = 30.0
+# Plantillas de heartbeat y echo: solo timestamp, contadores y mensaje original cambian
+HEARTBEAT_TEMPLATE = (
+    '{"type":"heartbeat","timestamp":"%s","server_status":"active",'
+    '"connected_clients":%d,"data_source":"%s"}'
+)
+# original_message se inserta tal cual: orjson.loads ya validó que es JSON
+ECHO_TEMPLATE = '{"type":"echo","original_message":%s,"timestamp":"%s","status":"received"}'
+
+# Tamaño máximo aceptado para el cuerpo del POST del Arduino ({"T":..,"PH":..,"C":..})
+MAX_ARDUINO_BODY_BYTES = 512
+
+# Tamaño de la cola de salida de cada cliente WebSocket; si se llena (cliente
+# lento) se descarta el mensaje más antiguo: solo importa la lectura más reciente
+CLIENT_QUEUE_SIZE = 16
+# Broadcasts seguidos con la cola llena tras los cuales el cliente se desconecta (código 1013)
+SLOW_CLIENT_MAX_TICKS = 5
+
+async def _send_orjson(websocket: WebSocket, data: Dict[str, Any]):
+    """Equivalente a send_json serializando con orjson (frame de texto para JSON.parse del navegador)"""
+    await websocket.send_text(orjson.dumps(data).decode())
+
+def _merge_readings(texts: List[str]) -> List[str]:
+    """
+    Une los frames de lecturas acumulados (sueltos o sobres "multi") en un único
+    sobre "multi", en orden y sin volver a parsear el JSON. Los demás frames
+    (heartbeat, echo) no son lecturas: salen aparte, en su lugar de la secuencia.
+    """
+    frames = []
+    run: List[str] = []
+    
+    def flush():
+        if len(run) == 1:
+            frames.append(run[0])
+        elif run:
+            items = [
+                text[len(MULTI_PREFIX):-len(MULTI_SUFFIX)] if text.startswith(MULTI_PREFIX) else text
+                for text in run
+            ]
+            frames.append(MULTI_PREFIX + ",".join(items) + MULTI_SUFFIX)
+        run.clear()
+    
+    for text in texts:
+        if text.startswith(READING_FRAME_PREFIXES):
+            run.append(text)
+        else:
+            flush()
+            frames.append(text)
+    flush()
+    return frames
+
+def _latest_snapshot(texts: List[str]) -> List[str]:
+    """Los snapshots del panel admin se reemplazan entre sí: basta con el último"""
+    return [texts[-1]]
+
+def _text_message(payload: str) -> Dict[str, Any]:
+    """Mensaje ASGI "websocket.send" de texto (el navegador hace JSON.parse sobre frames de texto)"""
+    return {"type": "websocket.send", "text": payload}
+
+async def _receive_raw(websocket: WebSocket):
+    """
+    Recibe el siguiente frame tal cual (bytes o str) para pasarlo directo a orjson.loads.
+    
+    A diferencia de receive_bytes(), acepta también frames de texto, que son los que
+    envían los navegadores; no hay decodificación ni copia intermedia en Starlette.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    raw = message.get("bytes")
+    return raw if raw is not None else message["text"]
+
+class ReadingClock:
+    """
+    Reloj de baja resolución para las marcas de tiempo de las lecturas.
+    
+    Las lecturas que llegan dentro del mismo tick (100 ms por defecto) comparten
+    el mismo objeto datetime: se consulta time.time() y solo se crea un datetime
+    nuevo cuando cambia el tick. Para un dashboard la precisión es suficiente.
+    """
+    
+    def __init__(self, ticks_per_second: int = 10):
+        self._ticks_per_second = ticks_per_second
+        self._microseconds_per_tick = 1_000_000 // ticks_per_second
+        self._tick = -1
+        self._now: Optional[datetime] = None
+    
+    def now(self) -> datetime:
+        tick = int(time.time() * self._ticks_per_second)
+        if tick != self._tick:
+            seconds, fraction = divmod(tick, self._ticks_per_second)
+            self._now = datetime.fromtimestamp(seconds).replace(
+                microsecond=fraction * self._microseconds_per_tick
+            )
+            self._tick = tick
+        return self._now
+
+reading_clock = ReadingClock()
+
 class DataSource(Enum):
     """Enum para identificar el origen de los datos"""
     MOCK = "mock"
     ARDUINO = "arduino"
 
-@dataclass
+class ArduinoPacket(msgspec.Struct):
+    """
+    Esquema del POST del Arduino: {"T": turbidez, "PH": pH, "C": conductividad}.
+    
+    msgspec parsea, valida campos requeridos y convierte a float en una sola
+    pasada en C, sin dict intermedio ni recorridos en Python.
+    """
+    T: float
+    PH: float
+    C: float
+
+# Decoder reutilizable: el esquema de ArduinoPacket se compila una sola vez
+arduino_decoder = msgspec.json.Decoder(ArduinoPacket)
+
+@dataclass(slots=True, frozen=True)
 class SensorReading:
-    """Clase de datos para una lectura de sensores"""
+    """
+    Clase de datos para una lectura de sensores.
+    
+    Los valores se guardan ya redondeados a 2 decimales (se redondean una vez al
+    entrar, no en cada serialización).
+    """
     turbidity: float
     ph: float
     conductivity: float
     timestamp: datetime
     source: DataSource
+    # JSON de la lectura, serializado una sola vez (la lectura es inmutable)
+    _cached: Optional[bytes] = field(default=None, init=False, repr=False, compare=False)
     
-    def to_dict(self) -> Dict[str, Any]:
-        """Convierte la lectura a diccionario para JSON serialization"""
-        return {
-            "T": round(self.turbidity, 2),
-            "PH": round(self.ph, 2),
-            "C": round(self.conductivity, 2),
-            "timestamp": self.timestamp.isoformat(),
-            "source": self.source.value
-        }
+    def to_bytes(self) -> bytes:
+        """Serializa la lectura con orjson (datetime y Enum nativos) y memoiza el resultado"""
+        if self._cached is None:
+            object.__setattr__(self, "_cached", orjson.dumps({
+                "T": self.turbidity,
+                "PH": self.ph,
+                "C": self.conductivity,
+                "timestamp": self.timestamp,
+                "source": self.source
+            }))
+        return self._cached
+    
+    def to_fragment(self) -> orjson.Fragment:
+        """JSON ya serializado para incrustar en otros payloads sin rehacer el dict"""
+        return orjson.Fragment(self.to_bytes())
     
     @classmethod
-    def from_arduino_data(cls, data: Dict[str, Any]) -> 'SensorReading':
-        """Crea una SensorReading desde datos del Arduino"""
+    def from_arduino_packet(cls, packet: ArduinoPacket) -> 'SensorReading':
+        """Crea una SensorReading desde un paquete del Arduino ya validado"""
         return cls(
-            turbidity=float(data["T"]),
-            ph=float(data["PH"]),
-            conductivity=float(data["C"]),
-            timestamp=datetime.now(),
+            turbidity=round(packet.T, 2),
+            ph=round(packet.PH, 2),
+            conductivity=round(packet.C, 2),
+            timestamp=reading_clock.now(),
             source=DataSource.ARDUINO
         )
 
+class RedisBridge:
+    """
+    Puente pub/sub sobre Redis para correr varios workers de uvicorn.
+    
+    El worker que recibe una lectura la publica; cada worker está suscrito
+    al canal y aplica las lecturas recibidas a su estado local. Por un canal
+    de control viaja el modo mock (también guardado en una llave, para los
+    workers que arrancan después), y un lease elige al único worker que
+    genera datos simulados.
+    """
+    
+    def __init__(self, url: str, channel: str):
+        self.url = url
+        self.channel = channel
+        self.control_channel = f"{channel}:control"
+        self._mode_key = f"{channel}:mock_mode"
+        self._leader_key = f"{channel}:mock_leader"
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._client = None
+        self._pubsub = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self, on_reading: Callable[[bytes], None], on_control: Callable[[bytes], None]):
+        """Conecta, se suscribe a los canales y arranca la tarea de escucha"""
+        import redis.asyncio as redis  # Dependencia opcional, solo con REDIS_URL
+        
+        self._client = redis.from_url(self.url)
+        self._pubsub = self._client.pubsub()
+        await self._pubsub.subscribe(self.channel, self.control_channel)
+        self._task = asyncio.create_task(self._listen(on_reading, on_control))
+        logger.info(f"📡 Bus Redis conectado, canal: {self.channel} (worker {self.worker_id})")
+    
+    async def _listen(self, on_reading: Callable[[bytes], None], on_control: Callable[[bytes], None]):
+        """
+        Escucha los canales; si la conexión se cae, se vuelve a suscribir con
+        backoff exponencial. Mientras tanto update_reading aplica las lecturas
+        localmente (publish falla), así este worker sigue transmitiendo.
+        """
+        control_channel = self.control_channel.encode()
+        delay = REDIS_RECONNECT_BASE_SECONDS
+        while True:
+            try:
+                if self._pubsub is None:
+                    self._pubsub = self._client.pubsub()
+                    await self._pubsub.subscribe(self.channel, self.control_channel)
+                    logger.info(f"📡 Bus Redis re-suscrito al canal: {self.channel}")
+                async for message in self._pubsub.listen():
+                    delay = REDIS_RECONNECT_BASE_SECONDS
+                    if message["type"] == "message":
+                        try:
+                            if message["channel"] == control_channel:
+                                on_control(message["data"])
+                            else:
+                                on_reading(message["data"])
+                        except Exception as e:
+                            logger.error(f"💥 Mensaje inválido en el bus Redis: {str(e)}")
+                raise ConnectionError("la suscripción terminó")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"💥 Suscripción a Redis perdida ({str(e)}); reintentando en {delay:.1f}s")
+                await self._drop_pubsub()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, REDIS_RECONNECT_MAX_SECONDS)
+    
+    async def _drop_pubsub(self):
+        """Descarta la suscripción rota; _listen crea una nueva en el siguiente intento"""
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+    
+    async def publish(self, payload: bytes):
+        await self._client.publish(self.channel, payload)
+    
+    async def publish_mock_mode(self, enabled: bool):
+        """Guarda el modo mock compartido y lo anuncia a todos los workers"""
+        await self._client.set(self._mode_key, b"1" if enabled else b"0")
+        await self._client.publish(self.control_channel, orjson.dumps({"mock_mode": enabled}))
+    
+    async def get_mock_mode(self) -> Optional[bool]:
+        """Modo mock guardado por el cluster (None si nadie lo cambió todavía)"""
+        value = await self._client.get(self._mode_key)
+        return None if value is None else value == b"1"
+    
+    async def hold_mock_leadership(self) -> bool:
+        """
+        Toma o renueva el lease del generador mock; True si lo tiene este worker.
+        
+        Sin Redis no hay forma de coordinarse: cada worker genera para sus propios
+        clientes (las lecturas se aplican localmente) hasta que vuelva la conexión.
+        """
+        try:
+            if await self._client.set(self._leader_key, self.worker_id, nx=True, px=MOCK_LEADER_TTL_MS):
+                return True
+            if await self._client.get(self._leader_key) == self.worker_id.encode():
+                await self._client.pexpire(self._leader_key, MOCK_LEADER_TTL_MS)
+                return True
+            return False
+        except Exception as e:
+            logger.warning(f"⚠️ Redis no disponible para el lease mock ({str(e)}); generando localmente")
+            return True
+    
+    async def stop(self):
+        """Cancela la escucha y cierra la conexión"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._client is not None:
+            # Liberar el lease para que otro worker tome el generador sin esperar al TTL
+            try:
+                if await self._client.get(self._leader_key) == self.worker_id.encode():
+                    await self._client.delete(self._leader_key)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo liberar el lease del generador mock: {str(e)}")
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        if self._client is not None:
+            await self._client.aclose()
+        logger.info("✅ Bus Redis cerrado")
+
 class WaterMonitorState:
 
     def __init__(self):
@@ -115,18 +407,55 @@ class WaterMonitorState:
             timestamp=datetime.now(),
             source=DataSource.MOCK
         )
+        # Lectura actual ya serializada: se codifica una vez por lectura y todos los
+        # envíos (broadcast y datos iniciales) reutilizan el mismo buffer
+        self._monitor_payload: str = self.latest_reading.to_bytes().decode()
+        self._admin_payload: Optional[str] = None
+        # Se marca cuando cambian lectura, stats o configuración; solo entonces se reserializa
+        self._admin_payload_dirty = True
         
         # Separación clara de tipos de conexiones
-        self.monitor_clients: List[WebSocket] = []  # Solo clientes del dashboard de agua
-        self.admin_clients: List[WebSocket] = []    # Solo clientes del panel admin
+        # Cada cliente tiene su cola de salida y una tarea escritora: el broadcast solo
+        # encola (O(1) por cliente) y nunca espera a la red ni a clientes lentos
+        self.monitor_clients: Dict[WebSocket, asyncio.Queue] = {}  # Solo clientes del dashboard de agua
+        self.admin_clients: Dict[WebSocket, asyncio.Queue] = {}    # Solo clientes del panel admin
+        self._writer_tasks: Dict[WebSocket, asyncio.Task] = {}
+        # Tareas de heartbeat de los dashboards conectados (se cancelan al cerrar)
+        self._heartbeat_tasks: Set[asyncio.Task] = set()
+        # Cliente -> (último tick contado, ticks seguidos con la cola llena). Un cliente
+        # de /ws con ambos temas se encola dos veces por tick pero cuenta una sola
+        self._slow_ticks: Dict[WebSocket, tuple] = {}
+        self._broadcast_tick = 0
+        # Cierres de clientes lentos en curso: referencia fuerte hasta que terminan
+        self._close_tasks: Set[asyncio.Task] = set()
+        # Clientes de /ws: una sola cola registrada en monitor_clients y/o admin_clients
+        self._multiplexed: Dict[WebSocket, frozenset] = {}
+        # Clientes de /ws suscritos a ambos temas (aparecen en los dos diccionarios)
+        self._shared_clients = 0
         
         # Registro detallado con IDs únicos para debugging
         self.connection_registry: Dict[str, Dict] = {}
+        # Índice inverso websocket -> ID de conexión para bajas sin recorrer el registro
+        self._connection_ids: Dict[WebSocket, str] = {}
         
         # Configuración del sistema
-        self.use_mock_data: bool = True
+        # El modo mock es un Event: con el modo apagado el generador queda suspendido
+        # en wait() en lugar de despertar en cada intervalo solo para no hacer nada
+        self.mock_enabled = asyncio.Event()
+        self.mock_enabled.set()
         self.mock_task: Optional[asyncio.Task] = None
         
+        # Broadcast con debounce: update_reading solo marca el estado como "sucio"
+        # y una única tarea en segundo plano envía la última lectura
+        self._dirty = asyncio.Event()
+        # Lecturas (ya serializadas) acumuladas desde el último broadcast
+        self._pending: deque = deque(maxlen=MAX_PENDING_READINGS)
+        self.broadcast_task: Optional[asyncio.Task] = None
+        # Bus entre workers (solo si se configuró REDIS_URL y redis está instalado)
+        self.bus: Optional[RedisBridge] = None
+        # Clientes cuyo envío falló por desconexión desde el último broadcast
+        self._dropped_clients = 0
+        
         # Estadísticas del sistema
         self.stats = {
             "total_readings": 0,
@@ -136,6 +465,10 @@ class WaterMonitorState:
             "uptime_start": datetime.now(),
             "last_arduino_connection": None
         }
+        # Timestamps de stats ya formateados: uptime_start no cambia y
+        # last_arduino_connection solo se reformatea cuando llega un dato del Arduino
+        self._uptime_start_iso: str = self.stats["uptime_start"].isoformat()
+        self._last_arduino_iso: Optional[str] = None
         
         logger.info("🏗️ Estado del sistema inicializado con conteo de conexiones corregido")
     
@@ -146,6 +479,28 @@ class WaterMonitorState:
         timestamp = int(time.time() * 1000)
         return f"{client_type}_{client_host}_{client_port}_{timestamp}"
     
+    def get_stats_snapshot(self) -> Dict[str, Any]:
+        """Estadísticas listas para JSON, con los timestamps ISO cacheados"""
+        return {
+            **self.stats,
+            "uptime_start": self._uptime_start_iso,
+            "last_arduino_connection": self._last_arduino_iso,
+            # Asegurar que connected_clients refleje solo clientes web
+            "connected_clients": self.get_web_client_count()
+        }
+    
+    @property
+    def use_mock_data(self) -> bool:
+        """Indica si se generan datos simulados (respaldado por mock_enabled)"""
+        return self.mock_enabled.is_set()
+    
+    @use_mock_data.setter
+    def use_mock_data(self, enabled: bool):
+        if enabled:
+            self.mock_enabled.set()
+        else:
+            self.mock_enabled.clear()
+    
     def get_web_client_count(self) -> int:
         """
         NUEVO: Función específica para contar SOLO clientes web reales
@@ -153,88 +508,247 @@ class WaterMonitorState:
         Returns:
             int: Número total de clientes web conectados (dashboard + admin)
         """
-        return len(self.monitor_clients) + len(self.admin_clients)
+        return len(self.monitor_clients) + len(self.admin_clients) - self._shared_clients
     
     async def update_reading(self, reading: SensorReading):
         """Actualiza la última lectura y notifica a todos los clientes"""
-        self.latest_reading = reading
-        self.stats["total_readings"] += 1
+        reading_bytes = reading.to_bytes()
         
         if reading.source == DataSource.ARDUINO:
-            self.stats["arduino_readings"] += 1
-            self.stats["last_arduino_connection"] = datetime.now()
             logger.info(f"📡 Datos del Arduino: T={reading.turbidity}NTU, pH={reading.ph}, C={reading.conductivity}μS/cm")
             
-            # Registrar en sistema de monitoreo
-            data_json = json.dumps(reading.to_dict())
-            await system_monitor.record_arduino_data(len(data_json))
+            # Registrar en sistema de monitoreo (solo el worker que recibió el POST)
+            await system_monitor.record_arduino_data(len(reading_bytes))
         else:
-            self.stats["mock_readings"] += 1
             logger.debug(f"🎭 Datos simulados: T={reading.turbidity}NTU, pH={reading.ph}, C={reading.conductivity}μS/cm")
         
+        if self.bus is not None:
+            # Con varios workers: todos (incluido este) la aplican al recibirla del bus
+            try:
+                await self.bus.publish(reading_bytes)
+                return
+            except Exception as e:
+                # Redis caído: la lectura no se pierde, al menos llega a los clientes de este worker
+                logger.error(f"💥 No se pudo publicar en Redis ({str(e)}); lectura aplicada solo localmente")
+        self._apply_reading(reading, reading_bytes)
+    
+    def _apply_reading(self, reading: SensorReading, reading_bytes: bytes):
+        """
+        Fija la lectura actual, la cuenta en las stats y la agenda para el próximo
+        tick de broadcast. Con el bus, todos los workers pasan por aquí con cada
+        lectura, así las stats coinciden entre workers.
+        """
+        self.stats["total_readings"] += 1
+        if reading.source == DataSource.ARDUINO:
+            self.stats["arduino_readings"] += 1
+            # Misma marca de tiempo de la lectura: sin un segundo datetime.now()
+            self.stats["last_arduino_connection"] = reading.timestamp
+            self._last_arduino_iso = reading.timestamp.isoformat()
+        else:
+            self.stats["mock_readings"] += 1
+        
         # Actualizar conteo solo de clientes web reales
         self.stats["connected_clients"] = self.get_web_client_count()
         
-        # Notificar a todos los clientes conectados
-        await self._broadcast_to_clients()
-        await self._broadcast_to_admin()
+        self.latest_reading = reading
+        self._monitor_payload = reading_bytes.decode()
+        self._pending.append(reading_bytes)
+        self._admin_payload_dirty = True
+        self._dirty.set()
     
-    async def _broadcast_to_clients(self):
-        """Envía la última lectura a todos los clientes de monitoreo"""
-        if not self.monitor_clients:
-            return
+    def apply_remote_reading(self, reading_bytes: bytes):
+        """Aplica una lectura publicada en el bus por cualquier worker"""
+        data = orjson.loads(reading_bytes)
+        reading = SensorReading(
+            turbidity=data["T"],
+            ph=data["PH"],
+            conductivity=data["C"],
+            timestamp=datetime.fromisoformat(data["timestamp"]),
+            source=DataSource(data["source"])
+        )
+        # Los bytes recibidos ya son su JSON: se reutilizan en lugar de reserializar
+        object.__setattr__(reading, "_cached", reading_bytes)
+        self._apply_reading(reading, reading_bytes)
+    
+    def apply_remote_control(self, payload: bytes):
+        """Aplica un mensaje del canal de control (cambio de modo desde otro worker)"""
+        data = orjson.loads(payload)
+        if "mock_mode" in data:
+            self.use_mock_data = bool(data["mock_mode"])
+            self._admin_payload_dirty = True
+    
+    async def set_mock_mode(self, enabled: bool):
+        """Cambia el modo de datos; con el bus se propaga a todos los workers"""
+        self.use_mock_data = enabled
+        self._admin_payload_dirty = True
+        if self.bus is not None:
+            try:
+                await self.bus.publish_mock_mode(enabled)
+            except Exception as e:
+                logger.error(f"💥 No se pudo propagar el modo por Redis ({str(e)}); cambiado solo en este worker")
+    
+    async def broadcast_loop(self):
+        """Envía la lectura más reciente como máximo una vez por intervalo mínimo"""
+        while True:
+            await self._dirty.wait()
+            self._dirty.clear()
+            self._broadcast_tick += 1
+            
+            # Payload admin del snapshot actual: se reserializa solo si hay admins y cambió algo
+            if self.admin_clients and self._admin_payload_dirty:
+                self._admin_payload = self._build_admin_payload()
+                self._admin_payload_dirty = False
+            self._broadcast_to_clients(self._drain_pending())
+            self._broadcast_to_admin()
             
-        data = self.latest_reading.to_dict()
-        disconnected_clients = []
-        data_size = len(json.dumps(data))
+            if self._dropped_clients:
+                logger.info(f"🔌 {self._dropped_clients} clientes desconectados descartados desde el último broadcast")
+                self._dropped_clients = 0
+            
+            await asyncio.sleep(MIN_BROADCAST_INTERVAL_SECONDS)
+    
+    def _enqueue(self, clients: Dict[WebSocket, asyncio.Queue], payload: str,
+                 on_close: Callable[[WebSocket], None]):
+        """
+        Encola un payload para cada cliente; con la cola llena descarta el más antiguo.
         
-        for client in self.monitor_clients:
+        Un cliente que sigue con la cola llena durante SLOW_CLIENT_MAX_TICKS broadcasts
+        seguidos se desconecta con código 1013, para que no acumule memoria ni lecturas viejas.
+        """
+        # Un solo mensaje ASGI compartido por todas las colas: los escritores lo pasan
+        # tal cual al servidor, sin que send_text arme un dict nuevo por cliente
+        message = _text_message(payload)
+        tick = self._broadcast_tick
+        slow_clients = []
+        for client, queue in clients.items():
             try:
-                await client.send_json(data)
-                
-                # Registrar envío en sistema de monitoreo
-                await system_monitor.record_event(SystemEvent(
-                    event_type=EventType.DATA_SENT,
-                    timestamp=datetime.now(),
-                    source="water_monitor_broadcast",
-                    details={
-                        "bytes": data_size,
-                        "protocol": "WebSocket",
-                        "data_type": "sensor_reading",
-                        "explanation": "Datos enviados via WebSocket para visualización en tiempo real",
-                        "client_count": len(self.monitor_clients)
-                    }
-                ))
+                queue.put_nowait(message)
+                self._slow_ticks.pop(client, None)
+            except asyncio.QueueFull:
+                last_tick, ticks = self._slow_ticks.get(client, (None, 0))
+                if last_tick != tick:
+                    ticks += 1
+                if ticks > SLOW_CLIENT_MAX_TICKS:
+                    slow_clients.append(client)
+                    continue
+                self._slow_ticks[client] = (tick, ticks)
+                queue.get_nowait()
+                queue.put_nowait(message)
+        
+        for client in slow_clients:
+            logger.warning("🐢 Cliente demasiado lento (cola llena), desconectando")
+            on_close(client)
+            close_task = asyncio.create_task(self._close_slow_client(client))
+            self._close_tasks.add(close_task)
+            close_task.add_done_callback(self._close_tasks.discard)
+    
+    @staticmethod
+    async def _close_slow_client(websocket: WebSocket):
+        """Cierra un cliente lento con código 1013 (intentar más tarde)"""
+        try:
+            await websocket.close(code=1013)
+        except Exception:
+            pass
+    
+    async def _writer_loop(self, websocket: WebSocket, queue: asyncio.Queue,
+                           on_close: Callable[[WebSocket], None], record_sent: bool,
+                           merge: Optional[Callable[[List[str]], List[str]]]):
+        """
+        Tarea escritora de un cliente: drena su cola y envía en orden.
+        
+        Si al despertar hay varios mensajes acumulados (cliente o red lentos), se
+        combinan con merge() y salen en menos frames en lugar de uno por mensaje.
+        Sin merge (clientes de /ws con ambos temas) se envían uno por uno. El primer
+        mensaje (estado inicial) nunca se combina, para que no lo reemplace un broadcast.
+        """
+        coalesce = False
+        try:
+            while True:
+                message = await queue.get()
+                if coalesce and merge is not None and not queue.empty():
+                    texts = [message["text"]]
+                    while not queue.empty():
+                        texts.append(queue.get_nowait()["text"])
+                    messages = [_text_message(text) for text in merge(texts)]
+                else:
+                    messages = (message,)
+                coalesce = True
                 
-            except Exception as e:
-                logger.warning(f"🔌 Cliente desconectado: {str(e)}")
-                disconnected_clients.append(client)
+                for message in messages:
+                    await websocket.send(message)
+                    
+                    if record_sent and message["text"].startswith(READING_FRAME_PREFIXES):
+                        # Registrar envío en sistema de monitoreo
+                        await system_monitor.record_event(SystemEvent(
+                            event_type=EventType.DATA_SENT,
+                            timestamp=datetime.now(),
+                            source="water_monitor_broadcast",
+                            details={
+                                "bytes": len(message["text"]),
+                                "protocol": "WebSocket",
+                                "data_type": "sensor_reading",
+                                "explanation": "Datos enviados via WebSocket para visualización en tiempo real",
+                                "client_count": len(self.monitor_clients)
+                            }
+                        ))
+        except CLIENT_GONE_ERRORS:
+            # Desconexión normal: solo se cuenta, el broadcast loop la reporta agregada
+            self._dropped_clients += 1
+        except Exception as e:
+            logger.warning(f"🔌 Error inesperado enviando a cliente: {str(e)}")
+        finally:
+            if self._writer_tasks.get(websocket) is asyncio.current_task():
+                on_close(websocket)
+    
+    def _start_writer(self, websocket: WebSocket, clients: Dict[WebSocket, asyncio.Queue],
+                      on_close: Callable[[WebSocket], None], record_sent: bool,
+                      merge: Optional[Callable[[List[str]], List[str]]]) -> asyncio.Queue:
+        """Crea la cola de salida y la tarea escritora de un cliente nuevo"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        clients[websocket] = queue
+        self._writer_tasks[websocket] = asyncio.create_task(
+            self._writer_loop(websocket, queue, on_close, record_sent, merge)
+        )
+        return queue
+    
+    def _stop_writer(self, websocket: WebSocket):
+        """Cancela la tarea escritora de un cliente (salvo que sea la tarea actual)"""
+        self._slow_ticks.pop(websocket, None)
+        writer = self._writer_tasks.pop(websocket, None)
+        if writer and writer is not asyncio.current_task():
+            writer.cancel()
+    
+    def _drain_pending(self) -> Optional[str]:
+        """
+        Arma el payload del dashboard con las lecturas acumuladas en la ventana.
         
-        # Remover clientes desconectados
-        for client in disconnected_clients:
-            self.monitor_clients.remove(client)
-            
-        # Actualizar estadísticas solo con clientes web reales
-        self.stats["connected_clients"] = self.get_web_client_count()
+        Una sola lectura mantiene el formato de siempre; varias se envían en un
+        sobre {"type": "multi", "payload": [...]} armado con sus bytes ya serializados.
+        """
+        batch = list(self._pending)
+        self._pending.clear()
+        if not batch:
+            return None
+        if len(batch) == 1:
+            return batch[0].decode()
+        return MULTI_PREFIX + b",".join(batch).decode() + MULTI_SUFFIX
     
-    async def _broadcast_to_admin(self):
-        """Envía estadísticas del sistema al panel de administración"""
-        if not self.admin_clients:
-            return
-            
+    def _broadcast_to_clients(self, payload: Optional[str]):
+        """Encola un payload ya serializado para todos los clientes de monitoreo"""
+        if payload and self.monitor_clients:
+            self._enqueue(self.monitor_clients, payload, self.remove_monitor_client)
+    
+    def _build_admin_payload(self, message_type: str = "system_update") -> str:
+        """
+        Serializa el snapshot del panel admin para la lectura actual.
+        
+        Lo usan tanto el broadcast ("system_update") como el estado inicial de
+        cada admin al conectarse ("system_status"), que tienen el mismo contenido.
+        """
         admin_data = {
-            "type": "system_update",
-            "latest_reading": self.latest_reading.to_dict(),
-            "stats": {
-                **self.stats,
-                "uptime_start": self.stats["uptime_start"].isoformat(),
-                "last_arduino_connection": (
-                    self.stats["last_arduino_connection"].isoformat() 
-                    if self.stats["last_arduino_connection"] else None
-                ),
-                # Asegurar que connected_clients refleje solo clientes web
-                "connected_clients": self.get_web_client_count()
-            },
+            "type": message_type,
+            "latest_reading": self.latest_reading.to_fragment(),
+            "stats": self.get_stats_snapshot(),
             "config": {
                 "use_mock_data": self.use_mock_data,
                 "connected_monitor_clients": len(self.monitor_clients),
@@ -243,23 +757,23 @@ class WaterMonitorState:
                 "total_web_clients": self.get_web_client_count()
             }
         }
-        
-        disconnected_clients = []
-        for client in self.admin_clients:
-            try:
-                await client.send_json(admin_data)
-            except Exception as e:
-                logger.warning(f"🔌 Admin cliente desconectado: {str(e)}")
-                disconnected_clients.append(client)
-        
-        # Remover clientes desconectados
-        for client in disconnected_clients:
-            self.admin_clients.remove(client)
+        return orjson.dumps(admin_data).decode()
+    
+    def _broadcast_to_admin(self):
+        """Encola las estadísticas del sistema para el panel de administración"""
+        if self.admin_clients:
+            # Mismo buffer para todos los admin
+            self._enqueue(self.admin_clients, self._admin_payload or self._build_admin_payload(),
+                          self.remove_admin_client)
     
     def add_monitor_client(self, websocket: WebSocket) -> str:
         """Registra un nuevo cliente de monitoreo"""
         connection_id = self.generate_connection_id(websocket, "monitor")
-        self.monitor_clients.append(websocket)
+        queue = self._start_writer(websocket, self.monitor_clients, self.remove_monitor_client,
+                                   True, _merge_readings)
+        # Lectura actual como primer mensaje, en orden con los broadcasts siguientes
+        queue.put_nowait(_text_message(self._monitor_payload))
+        self._connection_ids[websocket] = connection_id
         self.connection_registry[connection_id] = {
             "websocket": websocket,
             "type": "monitor",
@@ -268,33 +782,39 @@ class WaterMonitorState:
         
         #  Actualizar conteo solo con clientes web reales
         self.stats["connected_clients"] = self.get_web_client_count()
+        self._admin_payload_dirty = True
         
         logger.info(f"👥 Cliente de monitoreo conectado. Dashboard clients: {len(self.monitor_clients)}, Total web clients: {self.get_web_client_count()}")
         return connection_id
     
     def remove_monitor_client(self, websocket: WebSocket):
         """Remueve un cliente de monitoreo"""
+        if websocket in self._multiplexed:
+            return self.remove_multiplexed_client(websocket)
+        
+        # Remover del registro también
+        connection_id = self._connection_ids.pop(websocket, None)
+        if connection_id:
+            self.connection_registry.pop(connection_id, None)
+        
         if websocket in self.monitor_clients:
-            self.monitor_clients.remove(websocket)
+            del self.monitor_clients[websocket]
+            self._stop_writer(websocket)
             
-            # Remover del registro también
-            connection_id = None
-            for conn_id, info in self.connection_registry.items():
-                if info["websocket"] == websocket:
-                    connection_id = conn_id
-                    break
-            if connection_id:
-                del self.connection_registry[connection_id]
-                
             # Actualizar conteo solo con clientes web reales
             self.stats["connected_clients"] = self.get_web_client_count()
+            self._admin_payload_dirty = True
             
             logger.info(f"👥 Cliente de monitoreo desconectado. Dashboard clients: {len(self.monitor_clients)}, Total web clients: {self.get_web_client_count()}")
     
     def add_admin_client(self, websocket: WebSocket) -> str:
         """Registra un nuevo cliente administrador"""
         connection_id = self.generate_connection_id(websocket, "admin")
-        self.admin_clients.append(websocket)
+        queue = self._start_writer(websocket, self.admin_clients, self.remove_admin_client,
+                                   False, _latest_snapshot)
+        # Estado inicial como primer mensaje: lo envía el escritor, en orden con los broadcasts
+        queue.put_nowait(_text_message(self._build_admin_payload("system_status")))
+        self._connection_ids[websocket] = connection_id
         self.connection_registry[connection_id] = {
             "websocket": websocket,
             "type": "admin",
@@ -303,62 +823,196 @@ class WaterMonitorState:
         
         # Actualizar conteo solo con clientes web reales
         self.stats["connected_clients"] = self.get_web_client_count()
+        self._admin_payload_dirty = True
         
         logger.info(f"🛠️ Cliente admin conectado. Admin clients: {len(self.admin_clients)}, Total web clients: {self.get_web_client_count()}")
         return connection_id
     
     def remove_admin_client(self, websocket: WebSocket):
         """Remueve un cliente administrador"""
+        if websocket in self._multiplexed:
+            return self.remove_multiplexed_client(websocket)
+        
+        # Remover del registro también
+        connection_id = self._connection_ids.pop(websocket, None)
+        if connection_id:
+            self.connection_registry.pop(connection_id, None)
+        
         if websocket in self.admin_clients:
-            self.admin_clients.remove(websocket)
+            del self.admin_clients[websocket]
+            self._stop_writer(websocket)
             
-            # Remover del registro también
-            connection_id = None
-            for conn_id, info in self.connection_registry.items():
-                if info["websocket"] == websocket:
-                    connection_id = conn_id
-                    break
-            if connection_id:
-                del self.connection_registry[connection_id]
-                
             # Actualizar conteo solo con clientes web reales
             self.stats["connected_clients"] = self.get_web_client_count()
+            self._admin_payload_dirty = True
             
             logger.info(f"🛠️ Cliente admin desconectado. Admin clients: {len(self.admin_clients)}, Total web clients: {self.get_web_client_count()}")
+    
+    def add_multiplexed_client(self, websocket: WebSocket, topics: frozenset) -> str:
+        """
+        Registra un cliente de /ws con una sola cola y un solo escritor para todos
+        sus temas: la misma cola queda en monitor_clients y/o admin_clients, así
+        cada broadcast le llega por el mismo socket.
+        """
+        readings = TOPIC_READINGS in topics
+        admin = TOPIC_ADMIN_STATS in topics
+        connection_id = self.generate_connection_id(websocket, "multiplexed")
+        
+        if readings and admin:
+            merge = None
+        elif readings:
+            merge = _merge_readings
+        else:
+            merge = _latest_snapshot
+        clients = self.monitor_clients if readings else self.admin_clients
+        queue = self._start_writer(websocket, clients, self.remove_multiplexed_client, readings, merge)
+        self._multiplexed[websocket] = topics
+        
+        # Estado actual de cada tema como primeros mensajes, en orden con los broadcasts
+        if readings:
+            queue.put_nowait(_text_message(self._monitor_payload))
+        if admin:
+            self.admin_clients[websocket] = queue
+            queue.put_nowait(_text_message(self._build_admin_payload("system_status")))
+        if readings and admin:
+            self._shared_clients += 1
+        
+        self._connection_ids[websocket] = connection_id
+        self.connection_registry[connection_id] = {
+            "websocket": websocket,
+            "type": "multiplexed",
+            "topics": sorted(topics),
+            "connected_at": datetime.now()
+        }
+        
+        # Actualizar conteo solo con clientes web reales
+        self.stats["connected_clients"] = self.get_web_client_count()
+        self._admin_payload_dirty = True
+        
+        logger.info(f"🔀 Cliente /ws conectado (temas: {', '.join(sorted(topics))}). Total web clients: {self.get_web_client_count()}")
+        return connection_id
+    
+    def remove_multiplexed_client(self, websocket: WebSocket):
+        """Remueve un cliente de /ws de todos sus temas"""
+        topics = self._multiplexed.pop(websocket, None)
+        if topics is None:
+            return
+        
+        connection_id = self._connection_ids.pop(websocket, None)
+        if connection_id:
+            self.connection_registry.pop(connection_id, None)
+        
+        in_monitor = self.monitor_clients.pop(websocket, None) is not None
+        in_admin = self.admin_clients.pop(websocket, None) is not None
+        if in_monitor and in_admin:
+            self._shared_clients -= 1
+        self._stop_writer(websocket)
+        
+        # Actualizar conteo solo con clientes web reales
+        self.stats["connected_clients"] = self.get_web_client_count()
+        self._admin_payload_dirty = True
+        
+        logger.info(f"🔀 Cliente /ws desconectado. Total web clients: {self.get_web_client_count()}")
 
 # Instancia global del estado del sistema
 water_state = WaterMonitorState()
 
+# Tamaño del lote de muestras simuladas generadas de una vez
+MOCK_BATCH_SIZE = 1024
+
+def _range_span(value_range: tuple) -> tuple:
+    """(mínimo, amplitud) de un rango (lo, hi) de MOCK_DATA_CONFIG"""
+    lo, hi = value_range
+    return lo, hi - lo
+
+class MockSampleBuffer:
+    """
+    Lotes pre-generados de muestras simuladas (turbidez, pH, conductividad).
+    
+    Genera MOCK_BATCH_SIZE filas ya redondeadas de una vez y entrega una por
+    tick; al agotarse el lote se genera el siguiente.
+    """
+    
+    def __init__(self, batch_size: int = MOCK_BATCH_SIZE):
+        self._rng = random.Random()
+        self._batch_size = batch_size
+        self._rows: List[tuple] = []
+        self._index = 0
+    
+    def _refill(self):
+        # random() es una llamada C sin argumentos; el rango se aplica como lo + span * r
+        rand = self._rng.random
+        t_lo, t_span = _range_span(MOCK_DATA_CONFIG["turbidity_range"])
+        ph_lo, ph_span = _range_span(MOCK_DATA_CONFIG["ph_range"])
+        c_lo, c_span = _range_span(MOCK_DATA_CONFIG["conductivity_range"])
+        self._rows = [
+            (round(t_lo + t_span * rand(), 2), round(ph_lo + ph_span * rand(), 2), round(c_lo + c_span * rand(), 2))
+            for _ in range(self._batch_size)
+        ]
+        self._index = 0
+    
+    def next(self) -> tuple:
+        if self._index >= len(self._rows):
+            self._refill()
+        row = self._rows[self._index]
+        self._index += 1
+        return row
+
+mock_samples = MockSampleBuffer()
+
 # Generador de datos simulados 
 async def generate_mock_data():
     """Generador de Datos Simulados para Pruebas"""
     logger.info("🎭 Iniciando generación de datos simulados cada {:.1f} segundos".format(MOCK_DATA_CONFIG["interval_seconds"]))
     
-    while True:
-        try:
-            if water_state.use_mock_data:
-                mock_reading = SensorReading(
-                    turbidity=round(random.uniform(*MOCK_DATA_CONFIG["turbidity_range"]), 2),
-                    ph=round(random.uniform(*MOCK_DATA_CONFIG["ph_range"]), 2),
-                    conductivity=round(random.uniform(*MOCK_DATA_CONFIG["conductivity_range"]), 2),
-                    timestamp=datetime.now(),
-                    source=DataSource.MOCK
-                )
-                
-                await water_state.update_reading(mock_reading)
+    # Ticks agendados sobre el reloj monótono del loop: el costo de cada iteración
+    # no se acumula como deriva entre lecturas
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time()
+    
+    try:
+        while True:
+            if not water_state.use_mock_data:
+                # Modo real: dormir sin timers hasta que el admin reactive el modo mock
+                await water_state.mock_enabled.wait()
+                next_tick = loop.time()
             
-            await asyncio.sleep(MOCK_DATA_CONFIG["interval_seconds"])
+            try:
+                # Con el bus, solo el worker con el lease genera; al resto la lectura les llega por el bus
+                if water_state.bus is None or await water_state.bus.hold_mock_leadership():
+                    turbidity, ph, conductivity = mock_samples.next()
+                    mock_reading = SensorReading(
+                        turbidity=turbidity,
+                        ph=ph,
+                        conductivity=conductivity,
+                        timestamp=reading_clock.now(),
+                        source=DataSource.MOCK
+                    )
+                    
+                    await water_state.update_reading(mock_reading)
             
-        except asyncio.CancelledError:
-            logger.info("🛑 Generación de datos mock cancelada")
-            break
-        except Exception as e:
-            logger.error(f"💥 Error en generación de datos mock: {str(e)}")
-            await asyncio.sleep(5)
+            except Exception as e:
+                # Sin reiniciar el agendado: el siguiente tick mantiene la cadencia
+                logger.error(f"💥 Error en generación de datos mock: {str(e)}")
+            
+            next_tick += MOCK_DATA_CONFIG["interval_seconds"]
+            now = loop.time()
+            if next_tick < now:
+                # Ticks perdidos (loop bloqueado o proceso suspendido): no recuperarlos en ráfaga
+                next_tick = now
+            await asyncio.sleep(next_tick - now)
+    
+    except asyncio.CancelledError:
+        logger.info("🛑 Generación de datos mock cancelada")
 
 # Endpoint HTTP para Arduino
 async def arduino_http_endpoint(request: Request) -> Response:
     """Endpoint HTTP POST para Recepción de Datos del Arduino"""
+    # En modo mock los datos se descartan: responder sin leer ni parsear el cuerpo
+    if water_state.use_mock_data:
+        logger.debug("🎭 Datos del Arduino ignorados (modo mock activo)")
+        return Response(status_code=202)
+    
     try:
         content_length = int(request.headers.get("content-length", 0))
         
@@ -366,25 +1020,26 @@ async def arduino_http_endpoint(request: Request) -> Response:
             logger.warning("🚨 Petición vacía del Arduino")
             return Response(status_code=400)
         
-        body = await request.body()
-        arduino_data = json.loads(body.decode('utf-8'))
+        if content_length > MAX_ARDUINO_BODY_BYTES:
+            logger.warning(f"🚨 Petición demasiado grande del Arduino: {content_length} bytes")
+            return Response(status_code=413)
         
-        required_fields = ["T", "PH", "C"]
-        if not all(field in arduino_data for field in required_fields):
-            logger.warning(f"🚨 Datos incompletos del Arduino: {arduino_data}")
-            return Response(status_code=400)
-        
-        reading = SensorReading.from_arduino_data(arduino_data)
+        body = await request.body()
+        if len(body) > MAX_ARDUINO_BODY_BYTES:
+            logger.warning(f"🚨 Petición demasiado grande del Arduino: {len(body)} bytes")
+            return Response(status_code=413)
+        # Parseo + validación + tipado en una sola llamada
+        packet = arduino_decoder.decode(body)
+        reading = SensorReading.from_arduino_packet(packet)
         
-        if not water_state.use_mock_data:
-            await water_state.update_reading(reading)
-            logger.info(f"✅ Datos del Arduino procesados y distribuidos a {water_state.get_web_client_count()} clientes web")
-            return Response(status_code=200)
-        else:
-            logger.debug("🎭 Datos del Arduino ignorados (modo mock activo)")
-            return Response(status_code=202)
+        await water_state.update_reading(reading)
+        logger.info(f"✅ Datos del Arduino procesados y distribuidos a {water_state.get_web_client_count()} clientes web")
+        return Response(status_code=200)
             
-    except json.JSONDecodeError as e:
+    except msgspec.ValidationError as e:
+        logger.warning(f"🚨 Datos incompletos del Arduino: {str(e)}")
+        return Response(status_code=400)
+    except msgspec.DecodeError as e:
         logger.error(f"💥 JSON inválido del Arduino: {str(e)}")
         return Response(status_code=400)
     except Exception as e:
@@ -392,18 +1047,42 @@ async def arduino_http_endpoint(request: Request) -> Response:
         return Response(status_code=500)
 
 # WebSocket Endpoints
+def _enqueue_to_monitor(websocket: WebSocket, payload: str) -> bool:
+    """
+    Encola un mensaje propio de un cliente de monitoreo (heartbeat, echo) en su cola
+    de salida, como los broadcasts: así solo su tarea escritora envía por el socket.
+    Devuelve False si el cliente ya no está registrado.
+    """
+    queue = water_state.monitor_clients.get(websocket)
+    if queue is None:
+        return False
+    water_state._enqueue({websocket: queue}, payload, water_state.remove_monitor_client)
+    return True
+
+async def _monitor_heartbeat(websocket: WebSocket):
+    """Tarea de heartbeat de un cliente de monitoreo: encola un latido cada intervalo"""
+    while True:
+        await asyncio.sleep(MONITOR_HEARTBEAT_SECONDS)
+        if not _enqueue_to_monitor(websocket, HEARTBEAT_TEMPLATE % (
+            datetime.now().isoformat(),
+            water_state.get_web_client_count(),
+            water_state.latest_reading.source.value
+        )):
+            # El escritor ya dio de baja al cliente; la recepción hace la limpieza
+            logger.info("💔 Conexión de monitoreo perdida (heartbeat sin cliente)")
+            return
+        logger.debug("🏓 Heartbeat encolado para el cliente de monitoreo")
+
 @monitor_websocket_events
 async def monitor_websocket_endpoint(websocket: WebSocket):
     """WebSocket para Clientes de Monitoreo (Dashboard Principal) """
     await websocket.accept()
     connection_id = water_state.add_monitor_client(websocket)
-    connection_start_time = time.time()
+    connection_start_time = time.monotonic()
+    heartbeat_task: Optional[asyncio.Task] = None
     
     try:
-        # Enviar datos actuales inmediatamente al conectarse
-        initial_data = water_state.latest_reading.to_dict()
-        await websocket.send_json(initial_data)
-        
+        # Los datos actuales ya quedaron encolados como primer mensaje al registrarse
         logger.info(f"📊 Cliente de monitoreo conectado y datos iniciales enviados (conexión: {connection_id[:8]})")
         logger.info(f"📈 Estado actual: Dashboard clients: {len(water_state.monitor_clients)}, Total web clients: {water_state.get_web_client_count()}")
         
@@ -421,63 +1100,50 @@ async def monitor_websocket_endpoint(websocket: WebSocket):
             }
         ))
         
+        # Heartbeat en su propia tarea: la recepción no necesita wait_for (ni un timer
+        # creado y cancelado por cada mensaje del cliente)
+        heartbeat_task = asyncio.create_task(_monitor_heartbeat(websocket))
+        water_state._heartbeat_tasks.add(heartbeat_task)
+        
         # Mantener conexión activa y procesar mensajes del cliente
         while True:
+            raw = await _receive_raw(websocket)
+            
             try:
-                message = await asyncio.wait_for(
-                    websocket.receive_text(), 
-                    timeout=30.0
-                )
+                client_data = orjson.loads(raw)
+                logger.debug(f"📨 Mensaje del cliente de monitoreo: {client_data}")
                 
-                try:
-                    client_data = json.loads(message)
-                    logger.debug(f"📨 Mensaje del cliente de monitoreo: {client_data}")
-                    
-                    await websocket.send_json({
-                        "type": "echo",
-                        "original_message": client_data,
-                        "timestamp": datetime.now().isoformat(),
-                        "status": "received"
-                    })
-                    
-                    await system_monitor.record_event(SystemEvent(
-                        event_type=EventType.DATA_RECEIVED,
-                        timestamp=datetime.now(),
-                        source="water_monitor_client",
-                        details={
-                            "message_type": client_data.get("type", "unknown"),
-                            "bytes": len(message),
-                            "protocol": "WebSocket",
-                            "explanation": "Cliente envía comando interactivo via WebSocket"
-                        }
-                    ))
-                    
-                except json.JSONDecodeError:
-                    logger.warning(f"🚨 JSON inválido del cliente: {message}")
-                    
-            except asyncio.TimeoutError:
-                try:
-                    heartbeat_data = {
-                        "type": "heartbeat",
-                        "timestamp": datetime.now().isoformat(),
-                        "server_status": "active",
-                        "connected_clients": water_state.get_web_client_count(), 
-                        "data_source": water_state.latest_reading.source.value
+                _enqueue_to_monitor(websocket, ECHO_TEMPLATE % (
+                    raw if isinstance(raw, str) else raw.decode(),
+                    datetime.now().isoformat()
+                ))
+                
+                await system_monitor.record_event(SystemEvent(
+                    event_type=EventType.DATA_RECEIVED,
+                    timestamp=datetime.now(),
+                    source="water_monitor_client",
+                    details={
+                        "message_type": client_data.get("type", "unknown"),
+                        "bytes": len(raw),
+                        "protocol": "WebSocket",
+                        "explanation": "Cliente envía comando interactivo via WebSocket"
                     }
-                    await websocket.send_json(heartbeat_data)
-                    logger.debug("🏓 Heartbeat enviado al cliente de monitoreo")
-                except:
-                    logger.info("💔 Conexión de monitoreo perdida (heartbeat falló)")
-                    break
+                ))
+                
+            except orjson.JSONDecodeError:
+                logger.warning(f"🚨 JSON inválido del cliente: {raw!r}")
                     
     except WebSocketDisconnect:
         logger.info(f"🔌 Cliente de monitoreo desconectado normalmente (conexión: {connection_id[:8]})")
     except Exception as e:
         logger.error(f"💥 Error en WebSocket de monitoreo: {str(e)}")
     finally:
+        if heartbeat_task is not None:
+            heartbeat_task.cancel()
+            water_state._heartbeat_tasks.discard(heartbeat_task)
         water_state.remove_monitor_client(websocket)
         
-        duration = (time.time() - connection_start_time) * 1000
+        duration = (time.monotonic() - connection_start_time) * 1000
         await system_monitor.record_event(SystemEvent(
             event_type=EventType.DISCONNECTION,
             timestamp=datetime.now(),
@@ -492,36 +1158,74 @@ async def monitor_websocket_endpoint(websocket: WebSocket):
             duration_ms=duration
         ))
 
+async def _handle_admin_command(websocket: WebSocket, raw, connection_id: str):
+    """Procesa un comando del panel admin (recibido por /admin-dashboard/ws o /ws)"""
+    try:
+        command_data = orjson.loads(raw)
+        command = command_data.get("command")
+        
+        logger.info(f"🎛️ Comando admin recibido: {command}")
+        
+        if command == "set_mock_mode":
+            new_mode = command_data.get("value", True)
+            old_mode = water_state.use_mock_data
+            await water_state.set_mock_mode(new_mode)
+            
+            response = {
+                "type": "command_response",
+                "command": "set_mock_mode",
+                "success": True,
+                "message": f"Modo cambiado de {'simulado' if old_mode else 'real'} a {'simulado' if new_mode else 'real'}",
+                "new_value": new_mode
+            }
+            await _send_orjson(websocket, response)
+            logger.info(f"🔄 Modo de datos cambiado a: {'simulado' if new_mode else 'real'}")
+            
+            await system_monitor.record_event(SystemEvent(
+                event_type=EventType.DATA_RECEIVED,
+                timestamp=datetime.now(),
+                source="admin_command",
+                details={
+                    "command": "set_mock_mode",
+                    "old_mode": "mock" if old_mode else "arduino",
+                    "new_mode": "mock" if new_mode else "arduino",
+                    "explanation": f"Sistema cambiado a modo {'simulado' if new_mode else 'real'} desde panel admin",
+                    "admin_connection_id": connection_id
+                }
+            ))
+        
+        elif command == "get_stats":
+            stats_response = {
+                "type": "stats_response",
+                "stats": water_state.get_stats_snapshot()
+            }
+            await _send_orjson(websocket, stats_response)
+        
+        else:
+            error_response = {
+                "type": "error",
+                "message": f"Comando no reconocido: {command}",
+                "available_commands": ["set_mock_mode", "get_stats"]
+            }
+            await _send_orjson(websocket, error_response)
+    
+    except orjson.JSONDecodeError:
+        logger.warning(f"🚨 JSON inválido del admin: {raw!r}")
+        error_response = {
+            "type": "error",
+            "message": "Formato JSON inválido"
+        }
+        await _send_orjson(websocket, error_response)
+
 @monitor_websocket_events
 async def admin_websocket_endpoint(websocket: WebSocket):
     """WebSocket para Panel de Administración del Sistema """
     await websocket.accept()
     connection_id = water_state.add_admin_client(websocket)
-    connection_start_time = time.time()
+    connection_start_time = time.monotonic()
     
     try:
-        # Enviar estado inicial del sistema
-        initial_status = {
-            "type": "system_status",
-            "config": {
-                "use_mock_data": water_state.use_mock_data,
-                "connected_monitor_clients": len(water_state.monitor_clients),
-                "connected_admin_clients": len(water_state.admin_clients),
-                "total_web_clients": water_state.get_web_client_count()
-            },
-            "latest_reading": water_state.latest_reading.to_dict(),
-            "stats": {
-                **water_state.stats,
-                "uptime_start": water_state.stats["uptime_start"].isoformat(),
-                "last_arduino_connection": (
-                    water_state.stats["last_arduino_connection"].isoformat() 
-                    if water_state.stats["last_arduino_connection"] else None
-                ),
-                "connected_clients": water_state.get_web_client_count()
-            }
-        }
-        await websocket.send_json(initial_status)
-        
+        # El estado inicial del sistema ya quedó encolado como primer mensaje al registrarse
         logger.info(f"🛠️ Cliente admin conectado y estado inicial enviado (conexión: {connection_id[:8]})")
         logger.info(f"📈 Estado actual: Admin clients: {len(water_state.admin_clients)}, Total web clients: {water_state.get_web_client_count()}")
         
@@ -543,73 +1247,9 @@ async def admin_websocket_endpoint(websocket: WebSocket):
         
         # Procesar comandos del panel admin
         while True:
-            message = await websocket.receive_text()
+            raw = await _receive_raw(websocket)
+            await _handle_admin_command(websocket, raw, connection_id)
             
-            try:
-                command_data = json.loads(message)
-                command = command_data.get("command")
-                
-                logger.info(f"🎛️ Comando admin recibido: {command}")
-                
-                if command == "set_mock_mode":
-                    new_mode = command_data.get("value", True)
-                    old_mode = water_state.use_mock_data
-                    water_state.use_mock_data = new_mode
-                    
-                    response = {
-                        "type": "command_response",
-                        "command": "set_mock_mode",
-                        "success": True,
-                        "message": f"Modo cambiado de {'simulado' if old_mode else 'real'} a {'simulado' if new_mode else 'real'}",
-                        "new_value": new_mode
-                    }
-                    await websocket.send_json(response)
-                    logger.info(f"🔄 Modo de datos cambiado a: {'simulado' if new_mode else 'real'}")
-                    
-                    await system_monitor.record_event(SystemEvent(
-                        event_type=EventType.DATA_RECEIVED,
-                        timestamp=datetime.now(),
-                        source="admin_command",
-                        details={
-                            "command": "set_mock_mode",
-                            "old_mode": "mock" if old_mode else "arduino",
-                            "new_mode": "mock" if new_mode else "arduino",
-                            "explanation": f"Sistema cambiado a modo {'simulado' if new_mode else 'real'} desde panel admin",
-                            "admin_connection_id": connection_id
-                        }
-                    ))
-                
-                elif command == "get_stats":
-                    stats_response = {
-                        "type": "stats_response",
-                        "stats": {
-                            **water_state.stats,
-                            "uptime_start": water_state.stats["uptime_start"].isoformat(),
-                            "last_arduino_connection": (
-                                water_state.stats["last_arduino_connection"].isoformat() 
-                                if water_state.stats["last_arduino_connection"] else None
-                            ),
-                            "connected_clients": water_state.get_web_client_count()
-                        }
-                    }
-                    await websocket.send_json(stats_response)
-                
-                else:
-                    error_response = {
-                        "type": "error",
-                        "message": f"Comando no reconocido: {command}",
-                        "available_commands": ["set_mock_mode", "get_stats"]
-                    }
-                    await websocket.send_json(error_response)
-                    
-            except json.JSONDecodeError:
-                logger.warning(f"🚨 JSON inválido del admin: {message}")
-                error_response = {
-                    "type": "error",
-                    "message": "Formato JSON inválido"
-                }
-                await websocket.send_json(error_response)
-                
     except WebSocketDisconnect:
         logger.info(f"🔌 Cliente admin desconectado (conexión: {connection_id[:8]})")
     except Exception as e:
@@ -617,7 +1257,7 @@ async def admin_websocket_endpoint(websocket: WebSocket):
     finally:
         water_state.remove_admin_client(websocket)
         
-        duration = (time.time() - connection_start_time) * 1000
+        duration = (time.monotonic() - connection_start_time) * 1000
         # Registrar desconexión admin con información detallada
         await system_monitor.record_event(SystemEvent(
             event_type=EventType.DISCONNECTION,
@@ -635,13 +1275,84 @@ async def admin_websocket_endpoint(websocket: WebSocket):
             duration_ms=duration
         ))
 
-# Interfaz web de administración (sin cambios)
-async def get_admin_dashboard():
+async def multiplexed_websocket_endpoint(websocket: WebSocket):
+    """
+    WebSocket Multiplexado (/ws)
+    
+    Un solo socket para lecturas del dashboard y/o estadísticas del panel admin.
+    El primer mensaje del cliente elige los temas: {"subscribe": ["readings", "admin_stats"]}.
+    Con "admin_stats" el socket acepta además los comandos del panel admin.
+    """
+    await websocket.accept()
+    
+    try:
+        raw = await asyncio.wait_for(_receive_raw(websocket), timeout=SUBSCRIBE_TIMEOUT_SECONDS)
+        topics = frozenset(orjson.loads(raw).get("subscribe", ())) & WS_TOPICS
+    except WebSocketDisconnect:
+        return
+    except (asyncio.TimeoutError, orjson.JSONDecodeError, AttributeError, TypeError):
+        topics = frozenset()
+    
+    if not topics:
+        logger.warning("🚨 Cliente /ws sin suscripción válida, cerrando")
+        await _send_orjson(websocket, {
+            "type": "error",
+            "message": 'Se esperaba {"subscribe": [...]} como primer mensaje',
+            "available_topics": sorted(WS_TOPICS)
+        })
+        await websocket.close(code=1008)
+        return
+    
+    # Para el monitor de sistema cuenta como un solo cliente web
+    client_type = "admin" if TOPIC_ADMIN_STATS in topics else "monitor"
+    connection_id = water_state.add_multiplexed_client(websocket, topics)
+    system_connection_id = await system_monitor.record_connection(websocket, client_type)
+    connection_start_time = time.monotonic()
+    
+    try:
+        while True:
+            raw = await _receive_raw(websocket)
+            if TOPIC_ADMIN_STATS in topics:
+                await _handle_admin_command(websocket, raw, connection_id)
+            else:
+                logger.debug(f"📨 Mensaje ignorado de cliente /ws sin admin_stats: {raw!r}")
+    
+    except WebSocketDisconnect:
+        logger.info(f"🔌 Cliente /ws desconectado (conexión: {connection_id[:8]})")
+    except Exception as e:
+        logger.error(f"💥 Error en WebSocket multiplexado: {str(e)}")
+    finally:
+        water_state.remove_multiplexed_client(websocket)
+        duration = (time.monotonic() - connection_start_time) * 1000
+        await system_monitor.record_disconnection(system_connection_id, client_type, duration)
+
+# Páginas web del sistema
+# Directorio de archivos estáticos, resuelto una sola vez al importar
+STATIC_DIR = os.path.join(os.getcwd(), "static")
+
+# Las páginas son estáticas: se cargan una sola vez (ya comprimidas y con ETag),
+# sin os.path.exists ni stat de FileResponse en cada carga
+admin_dashboard_page = CachedPage(os.path.join(STATIC_DIR, "admin_dashboard.html"))
+water_monitor_page = CachedPage(os.path.join(STATIC_DIR, "ws_client.html"))
+
+async def get_water_monitor(request: Request):
+    """Página principal de monitoreo de agua"""
+    if water_monitor_page.available:
+        logger.info("📊 Sirviendo página de monitoreo de agua")
+        return water_monitor_page.response(request)
+    else:
+        logger.warning("⚠️ Archivo de monitoreo no encontrado")
+        return HTMLResponse(
+            "<html><body><h1>❌ Página de monitoreo no encontrada</h1>"
+            "<p>El archivo ws_client.html no existe en el directorio static/</p></body></html>",
+            status_code=404
+        )
+
+async def get_admin_dashboard(request: Request):
     """Página Web del Dashboard de Administración"""
-    html_path = os.path.join("static", "admin_dashboard.html")
-    if os.path.exists(html_path):
-        logger.info("🛠️ Sirviendo dashboard de administración desde archivo")
-        return FileResponse(html_path)
+    if admin_dashboard_page.available:
+        logger.info("🛠️ Sirviendo dashboard de administración desde memoria")
+        return admin_dashboard_page.response(request)
     else:
         logger.warning("⚠️ Archivo admin_dashboard.html no encontrado")
         return HTMLResponse(
@@ -656,81 +1367,92 @@ def register_routes(app: FastAPI):
     logger.info("🔗 Registrando rutas del sistema de monitoreo educativo...")
     
     # Configurar directorio de archivos estáticos
-    static_dir = os.path.join(os.getcwd(), "static")
-    if not os.path.exists(static_dir):
-        os.makedirs(static_dir, exist_ok=True)
-        logger.info(f"📁 Directorio estático creado: {static_dir}")
-    
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
-    logger.info(f"📁 Archivos estáticos montados desde: {static_dir}")
-    
-    @app.get("/water-monitor")
-    async def get_water_monitor():
-        """Página principal de monitoreo de agua"""
-        html_path = os.path.join(static_dir, "ws_client.html")
-        if os.path.exists(html_path):
-            logger.info("📊 Sirviendo página de monitoreo de agua")
-            return FileResponse(html_path)
-        else:
-            logger.warning("⚠️ Archivo de monitoreo no encontrado")
-            return HTMLResponse(
-                "<html><body><h1>❌ Página de monitoreo no encontrada</h1>"
-                "<p>El archivo ws_client.html no existe en el directorio static/</p></body></html>",
-                status_code=404
-            )
+    if not os.path.exists(STATIC_DIR):
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        logger.info(f"📁 Directorio estático creado: {STATIC_DIR}")
     
-    @app.get("/admin-dashboard")
-    async def get_admin_dashboard_route():
-        """Dashboard de administración del sistema"""
-        logger.info("🛠️ Sirviendo dashboard de administración")
-        return await get_admin_dashboard()
+    app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+    logger.info(f"📁 Archivos estáticos montados desde: {STATIC_DIR}")
     
-    @app.post("/water-monitor/publish")
-    async def arduino_http_route(request: Request):
-        """Endpoint HTTP POST optimizado para Arduino IoT"""
-        return await arduino_http_endpoint(request)
+    # Handlers de módulo registrados directamente, sin closures intermedias
+    app.add_api_route("/water-monitor", get_water_monitor, methods=["GET"])
+    app.add_api_route("/admin-dashboard", get_admin_dashboard, methods=["GET"])
+    app.add_api_route("/water-monitor/publish", arduino_http_endpoint, methods=["POST"])
+    app.add_websocket_route("/water-monitor", monitor_websocket_endpoint)
+    app.add_websocket_route("/admin-dashboard/ws", admin_websocket_endpoint)
+    app.add_websocket_route("/ws", multiplexed_websocket_endpoint)
     
-    @app.websocket("/water-monitor")
-    async def monitor_websocket_route(websocket: WebSocket):
-        """WebSocket para clientes de monitoreo del dashboard de agua"""
-        await monitor_websocket_endpoint(websocket)
+    logger.info("✅ Todas las rutas del sistema de monitoreo registradas")
+
+async def startup_water_monitor():
+    """Inicializar sistema de monitoreo al arrancar (llamado desde el lifespan de main.py)"""
+    logger.info("🚀 Iniciando sistema de monitoreo de agua educativo...")
     
-    @app.websocket("/admin-dashboard/ws")
-    async def admin_websocket_route(websocket: WebSocket):
-        """WebSocket para panel de administración del sistema"""
-        await admin_websocket_endpoint(websocket)
+    # Precalentar los payloads cacheados antes de aceptar la primera conexión
+    water_state._monitor_payload = water_state.latest_reading.to_bytes().decode()
+    water_state._admin_payload = water_state._build_admin_payload()
+    water_state._admin_payload_dirty = False
     
-    @app.on_event("startup")
-    async def startup_water_monitor():
-        """Inicializar sistema de monitoreo al arrancar"""
-        logger.info("🚀 Iniciando sistema de monitoreo de agua educativo...")
-        
-        water_state.mock_task = asyncio.create_task(generate_mock_data())
-        logger.info("🎭 Tarea de datos simulados iniciada para demos y desarrollo")
-        
-        await system_monitor.record_event(SystemEvent(
-            event_type=EventType.CONNECTION,
-            timestamp=datetime.now(),
-            source="water_monitor_startup",
-            details={
-                "subsystem": "water_monitoring",
-                "mock_data_enabled": water_state.use_mock_data,
-                "explanation": "Sistema de monitoreo de agua iniciado correctamente"
-            }
-        ))
+    if REDIS_URL:
+        try:
+            bus = RedisBridge(REDIS_URL, REDIS_CHANNEL)
+            await bus.start(water_state.apply_remote_reading, water_state.apply_remote_control)
+            # Un worker que arranca tarde adopta el modo que ya eligió el cluster
+            mock_mode = await bus.get_mock_mode()
+            if mock_mode is not None:
+                water_state.use_mock_data = mock_mode
+            water_state.bus = bus
+        except ImportError:
+            logger.warning("⚠️ REDIS_URL definido pero el paquete redis no está instalado; usando broadcast local")
+        except Exception as e:
+            logger.error(f"💥 No se pudo conectar a Redis ({str(e)}); usando broadcast local")
     
-    @app.on_event("shutdown")
-    async def shutdown_water_monitor():
-        """Cleanup al cerrar el sistema"""
-        logger.info("🛑 Cerrando sistema de monitoreo...")
-        
-        if water_state.mock_task and not water_state.mock_task.done():
-            water_state.mock_task.cancel()
-            try:
-                await water_state.mock_task
-            except asyncio.CancelledError:
-                logger.info("✅ Tarea de datos simulados cancelada")
-        
-        logger.info("✅ Sistema de monitoreo cerrado correctamente")
+    water_state.broadcast_task = asyncio.create_task(water_state.broadcast_loop())
+    water_state.mock_task = asyncio.create_task(generate_mock_data())
+    logger.info("🎭 Tarea de datos simulados iniciada para demos y desarrollo")
+    
+    await system_monitor.record_event(SystemEvent(
+        event_type=EventType.CONNECTION,
+        timestamp=datetime.now(),
+        source="water_monitor_startup",
+        details={
+            "subsystem": "water_monitoring",
+            "mock_data_enabled": water_state.use_mock_data,
+            "explanation": "Sistema de monitoreo de agua iniciado correctamente"
+        }
+    ))
+
+async def shutdown_water_monitor():
+    """Cleanup al cerrar el sistema (llamado desde el lifespan de main.py)"""
+    logger.info("🛑 Cerrando sistema de monitoreo...")
+    
+    if water_state.mock_task and not water_state.mock_task.done():
+        water_state.mock_task.cancel()
+        try:
+            await water_state.mock_task
+        except asyncio.CancelledError:
+            logger.info("✅ Tarea de datos simulados cancelada")
+    
+    if water_state.broadcast_task and not water_state.broadcast_task.done():
+        water_state.broadcast_task.cancel()
+        try:
+            await water_state.broadcast_task
+        except asyncio.CancelledError:
+            logger.info("✅ Tarea de broadcast cancelada")
+    
+    # Cancelar las tareas escritoras, de heartbeat y de cierre que queden y esperar a que terminen
+    client_tasks = [
+        *water_state._writer_tasks.values(),
+        *water_state._heartbeat_tasks,
+        *water_state._close_tasks
+    ]
+    for task in client_tasks:
+        task.cancel()
+    if client_tasks:
+        await asyncio.gather(*client_tasks, return_exceptions=True)
+    
+    if water_state.bus is not None:
+        await water_state.bus.stop()
+        water_state.bus = None
     
-    logger.info("✅ Todas las rutas del sistema de monitoreo registradas")
\ No newline at end of file
+    logger.info("✅ Sistema de monitoreo cerrado correctamente")